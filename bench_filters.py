@@ -0,0 +1,77 @@
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.filter_bench import FilterBenchmark, FilterSpec, corpus_from_file, corpus_from_stream
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Measure transaction filters over a corpus of transactions",
+                            parents=[chain.options_parser()])
+    parser.add_argument("-f", "--filter", metavar="FILE", action="append", default=[],
+                        help="filter script to run with testtxfilter, may be repeated")
+    parser.add_argument("-n", "--name", metavar="NAME", action="append", default=[],
+                        help="created filter to run with runtxfilter, may be repeated")
+    parser.add_argument("--for", dest="restrict_for", metavar="ENTITY",
+                        help="restrict the filter scripts to transactions for ENTITY")
+    corpus_group = parser.add_mutually_exclusive_group(required=True)
+    corpus_group.add_argument("--stream", metavar="NAME", help="take the transactions of the items of stream NAME")
+    corpus_group.add_argument("--corpus", metavar="FILE", help="file of transaction hex strings, one per line")
+    parser.add_argument("--limit", type=int, metavar="N", help="use at most N transactions")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=8,
+                        help="filter calls in parallel (default: %(default)s)")
+    parser.add_argument("-o", "--output", metavar="FILE", help="write the reports as JSON")
+
+    options = parser.parse_args()
+    if not options.filter and not options.name:
+        parser.error("at least one of --filter or --name is required")
+
+    option_display = chain.process_options(options)
+    option_display.append(("Filters", ', '.join(options.filter + options.name)))
+    option_display.append(("Corpus", options.stream or options.corpus))
+    option_display.append(("Limit", options.limit))
+    option_display.append(("Concurrency", options.concurrency))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency,
+                 datadir=chain.datadir, notifier=chain.notifier)
+    if options.stream:
+        corpus = corpus_from_stream(api, options.stream, options.limit)
+    else:
+        corpus = corpus_from_file(Path(options.corpus), options.limit)
+    logger.info(f"Corpus of {len(corpus):,} transactions")
+
+    restrictions = {"for": options.restrict_for} if options.restrict_for else {}
+    specs = [FilterSpec(path, script=Path(path).read_text(), restrictions=restrictions) for path in options.filter]
+    specs += [FilterSpec(name, name=name) for name in options.name]
+    benchmark = FilterBenchmark(logger, api, options.concurrency)
+    reports = []
+    for spec in specs:
+        report = benchmark.run(spec, corpus)
+        report.log(logger)
+        reports.append(report.to_dict())
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        logger.info(f"Reports written to {options.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
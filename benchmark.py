@@ -0,0 +1,201 @@
+import csv
+import json
+import logging
+import sys
+import tempfile
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from creator.chain import Chain
+from creator.metrics import CallMetrics, PERCENTILES
+from creator.mock_node import MockNode
+from creator.payload import PayloadPool
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+KEY_SIZE = 16
+SCAN_PAGE_SIZE = 100
+SCAN_PAGES = 10
+FILTER_SCRIPT = """
+var filtertransaction = function () {
+    var tx = getfiltertransaction();
+    if (tx.vout.length < 2) {
+        return 'Two transaction outputs required';
+    }
+};
+"""
+
+
+class Context:
+    """ State shared by the scenarios of one run. """
+
+    def __init__(self, api: RpcApi, iterations: int, seed: int):
+        self.api = api
+        self.iterations = iterations
+        self.payloads = PayloadPool(seed=seed)
+        self.stream = f"bench{datetime.now():%Y%m%d%H%M%S}"
+        api.command("create", "stream", self.stream, True)
+
+
+def measure(context: Context, method: str, make_args: Callable[[int], tuple]) -> Tuple[CallMetrics, float]:
+    """ Call `method` `iterations` times; return the call metrics and the elapsed time of the calls alone. """
+    metrics = CallMetrics()
+    context.api.metrics = metrics
+    try:
+        start = perf_counter()
+        for i in range(context.iterations):
+            context.api.command(method, *make_args(i), is_log=False)
+        elapsed = perf_counter() - start
+    finally:
+        context.api.metrics = None
+    return metrics, elapsed
+
+
+def publish_scenario(context: Context, size: int, keys: int = 1, options: str = "") -> Tuple[CallMetrics, float]:
+    def make_args(i: int) -> tuple:
+        key_list = [context.payloads.string("letters", KEY_SIZE) for _ in range(keys)]
+        args = (context.stream, key_list if keys > 1 else key_list[0], context.payloads.hex_data(size))
+        return args + (options,) if options else args
+    return measure(context, "publish", make_args)
+
+
+def scan_scenario(context: Context) -> Tuple[CallMetrics, float]:
+    items = context.api.command("liststreams", context.stream)[0]["items"]
+    missing = SCAN_PAGES * SCAN_PAGE_SIZE - items
+    if missing > 0:
+        # not measured: fill the stream when the scenario runs without the publish scenarios before it
+        context.api.command_batch([("publish", context.stream, context.payloads.string("letters", KEY_SIZE),
+                                    context.payloads.hex_data(32)) for _ in range(missing)])
+        items += missing
+    pages = max(1, items // SCAN_PAGE_SIZE)
+    return measure(context, "liststreamitems",
+                   lambda i: (context.stream, False, SCAN_PAGE_SIZE, (i % pages) * SCAN_PAGE_SIZE))
+
+
+def filter_scenario(context: Context) -> Tuple[CallMetrics, float]:
+    tx_id = context.api.command("publish", context.stream, "filter", context.payloads.hex_data(64))
+    tx_hex = context.api.get_raw_transaction(tx_id)
+    return measure(context, "testtxfilter", lambda i: ({"for": context.stream}, FILTER_SCRIPT, tx_hex))
+
+
+SCENARIOS: Dict[str, Callable[[Context], Tuple[CallMetrics, float]]] = {
+    "publish-32": partial(publish_scenario, size=32),
+    "publish-1k": partial(publish_scenario, size=1024),
+    "publish-16k": partial(publish_scenario, size=16384),
+    "publish-multikey": partial(publish_scenario, size=32, keys=10),
+    "publish-offchain": partial(publish_scenario, size=1024, options="offchain"),
+    "liststreamitems-scan": scan_scenario,
+    "testtxfilter": filter_scenario,
+}
+
+
+def run_scenarios(api: RpcApi, names: List[str], iterations: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    context = Context(api, iterations, seed)
+    results = {}
+    for name in names:
+        logger.info(f"Running {name}")
+        metrics, elapsed = SCENARIOS[name](context)
+        (method, stats), = metrics.snapshot()["methods"].items()
+        results[name] = dict(stats, rate=stats["calls"] / elapsed, elapsed=elapsed)
+        logger.info(f"  {stats['calls']:,} {method} calls, {stats['errors']:,} errors, "
+                    f"{results[name]['rate']:,.0f} calls/sec, p50 {stats['p50']:.2f} ms, p99 {stats['p99']:.2f} ms")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """ List scenarios whose throughput fell or p99 latency rose by more than `threshold` percent. """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["rate"] and result["rate"] < base["rate"] * (1 - threshold / 100):
+            regressions.append(f"{name}: {result['rate']:,.0f} calls/sec vs {base['rate']:,.0f} in baseline")
+        if base["p99"] and result["p99"] > base["p99"] * (1 + threshold / 100):
+            regressions.append(f"{name}: p99 {result['p99']:.2f} ms vs {base['p99']:.2f} ms in baseline")
+    return regressions
+
+
+def write_csv(path: str, results: Dict[str, Dict[str, Any]]):
+    columns = ["calls", "errors", "rate", "elapsed", "mean", "max"] + [label for label, _ in PERCENTILES]
+    with open(path, "w", newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["scenario"] + columns)
+        for name, result in results.items():
+            writer.writerow([name] + [result[column] for column in columns])
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Run benchmark scenarios against a chain", parents=[chain.options_parser()])
+    parser.add_argument("-s", "--scenario", metavar="NAME", action="append", choices=list(SCENARIOS),
+                        help=f"scenario to run, may be repeated (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("-n", "--iterations", type=int, metavar="N", default=1000,
+                        help="calls per scenario (default: %(default)s)")
+    parser.add_argument("--mock", action="store_true", help="run against an in-process mock node")
+    parser.add_argument("--seed", type=int, metavar="N", default=1, help="payload seed (default: %(default)s)")
+    parser.add_argument("-o", "--output", metavar="FILE", default="benchmark.json",
+                        help="JSON results file (default: %(default)s)")
+    parser.add_argument("--csv", metavar="FILE", help="also write results as CSV")
+    parser.add_argument("--baseline", metavar="FILE", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, metavar="PCT", default=10,
+                        help="flag regressions above PCT percent (default: %(default)s)")
+
+    options = parser.parse_args()
+    options.scenario = options.scenario or list(SCENARIOS)
+
+    option_display = chain.process_options(options)
+    option_display.append(("Scenarios", ', '.join(options.scenario)))
+    option_display.append(("Iterations", options.iterations))
+    option_display.append(("Mock node", options.mock))
+    option_display.append(("Output", options.output))
+    option_display.append(("Baseline", options.baseline))
+    option_display.append(("Threshold", f"{options.threshold}%"))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)["scenarios"]
+
+    with ExitStack() as stack:
+        if options.mock:
+            node = stack.enter_context(MockNode(chain.name))
+            chain = node.write_config(Path(stack.enter_context(tempfile.TemporaryDirectory())))
+        api = RpcApi(logger, chain.name, options.verbose, datadir=chain.datadir, notifier=chain.notifier)
+        results = run_scenarios(api, options.scenario, options.iterations, options.seed)
+
+    report = {"time": datetime.now().isoformat(), "chain": chain.name, "mock": options.mock,
+              "iterations": options.iterations, "seed": options.seed, "scenarios": results}
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {options.output}")
+    if options.csv:
+        write_csv(options.csv, results)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, options.threshold)
+        for regression in regressions:
+            logger.warning(f"Regression: {regression}")
+        if regressions:
+            return 1
+        logger.info(f"No regressions above {options.threshold}% against {options.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
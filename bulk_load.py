@@ -0,0 +1,58 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.bulk_load import BulkLoader, read_items
+from creator.chain import Chain
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Load stream items from a file, many items per transaction",
+                            parents=[chain.options_parser()])
+    parser.add_argument("file", metavar="FILE", help="JSON lines or CSV (.csv) file of stream items")
+    parser.add_argument("-s", "--stream", metavar="NAME", default="stream1",
+                        help="stream to load into (default: %(default)s)")
+    parser.add_argument("--create", action="store_true", help="create the stream if it does not exist")
+    parser.add_argument("--from", dest="from_address", metavar="ADDRESS",
+                        help="publishing address (default: the first address with send permission)")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=8,
+                        help="transactions submitted in parallel (default: %(default)s)")
+    parser.add_argument("--confirm", action="store_true", help="wait until the last transaction is mined")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Input", options.file))
+    option_display.append(("Stream", options.stream))
+    option_display.append(("Address", options.from_address or "default"))
+    option_display.append(("Concurrency", options.concurrency))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency,
+                 datadir=chain.datadir, notifier=chain.notifier)
+    if options.create and isinstance(api.command("liststreams", options.stream, is_log=False), dict):
+        api.print_tx("create", "stream", options.stream, True)
+        api.wait_for_mining()
+    loader = BulkLoader(logger, api, options.from_address, options.concurrency)
+    loader.load(read_items(Path(options.file), options.stream))
+    if options.confirm and loader.tx_ids:
+        api.wait_for_tx(loader.tx_ids[-1])
+        logger.info("Last transaction confirmed")
+    return 1 if loader.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
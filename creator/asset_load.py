@@ -0,0 +1,222 @@
+""" Asset transfer load: fund a pool of addresses with an asset, then transfer it among them at a target rate.
+
+Transfers are built with ``createrawsendfrom``. Keypairs with a private key (see `RpcApi.provision_addresses`)
+are signed with ``signrawtransaction`` and sent with ``sendrawtransaction``; wallet addresses are sent by
+``createrawsendfrom`` itself. The spendable balance of every address is tracked locally, so a transfer is only
+started from an address that can pay for it: an address has at most one transfer in flight, its change is
+spendable right away, and what it receives becomes spendable when the transfer that paid it is confirmed.
+Confirmations are found by reading every new block once, rather than polling each transaction.
+"""
+import logging
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from time import perf_counter, sleep
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from .keystore import KeyPair
+from .metrics import Histogram
+from .rpc_api import RpcApi
+
+FUNDING_OUTPUTS = 100
+FUNDING_TIMEOUT = 120
+
+
+class AssetLoad:
+    """ Transfer `amount` units of `asset` between random addresses of `keypairs`, `concurrency` at a time. """
+
+    def __init__(self, logger: logging.Logger, api: RpcApi, asset: str, keypairs: List[KeyPair], amount: float = 1,
+                 concurrency: int = 8, seed: int = None):
+        if len(keypairs) < 2:
+            raise ValueError("Asset load needs at least 2 addresses")
+        self.logger = logger
+        self.api = api
+        self.asset = asset
+        self.keys = {keypair["address"]: keypair.get("privkey") for keypair in keypairs}
+        self.addresses = list(self.keys)
+        self.amount = amount
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.condition = threading.Condition()
+        self.available: Dict[str, float] = {}
+        self.idle: Deque[str] = deque()
+        self.drained: Set[str] = set()
+        self.incoming: Dict[str, Tuple[str, float]] = {}
+        self.sent_at: Dict[str, float] = {}
+        self.unmatched: Dict[str, float] = {}
+        self.submit_latency = Histogram()
+        self.confirm_latency = Histogram()
+        self.sent = 0
+        self.failed = 0
+        self.stopped = threading.Event()
+
+    def load_balances(self):
+        """ Get the confirmed balance of every address in the pool. """
+        results = self.api.command_batch([("getaddressbalances", address) for address in self.addresses])
+        for address, result in zip(self.addresses, results):
+            balances = result.result if result.error is None else []
+            self.available[address] = sum(balance["qty"] for balance in balances if balance["name"] == self.asset)
+
+    def fund(self, from_address: str, quantity: float):
+        """ Top up every address of the pool to `quantity`, many addresses per transaction, and wait until mined. """
+        self.load_balances()
+        needed = {address: quantity - self.available[address] for address in self.addresses
+                  if self.available[address] < quantity}
+        self.logger.info(f"Funding {len(needed):,} of {len(self.addresses):,} addresses with {self.asset}")
+        addresses = list(needed)
+        tx_ids = []
+        for offset in range(0, len(addresses), FUNDING_OUTPUTS):
+            amounts = {address: {self.asset: needed[address]} for address in addresses[offset:offset + FUNDING_OUTPUTS]}
+            tx_ids.append(self.api.checked_command("createrawsendfrom", from_address, amounts, [], "send",
+                                                   is_log=False))
+        for tx_id in tx_ids:
+            self.api.wait_for_tx(tx_id, timeout=FUNDING_TIMEOUT)
+        for address, amount in needed.items():
+            self.available[address] += amount
+
+    def take_sender(self, timeout: float) -> Optional[str]:
+        """ Get an idle address that can pay `amount`, waiting up to `timeout` seconds for one. """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.idle, timeout):
+                return None
+            return self.idle.popleft()
+
+    def release(self, address: str):
+        """ Return `address` to the idle pool if it can pay another transfer. Call with the condition held. """
+        if self.available[address] >= self.amount:
+            self.drained.discard(address)
+            self.idle.append(address)
+            self.condition.notify()
+        else:
+            self.drained.add(address)
+
+    def transfer(self, sender: str, receiver: str) -> str:
+        amounts = {receiver: {self.asset: self.amount}}
+        privkey = self.keys[sender]
+        if privkey is None:
+            return self.api.checked_command("createrawsendfrom", sender, amounts, [], "send", is_log=False)
+        tx_hex = self.api.checked_command("createrawsendfrom", sender, amounts, is_log=False)
+        signed = self.api.checked_command("signrawtransaction", tx_hex, [], [privkey], is_log=False)
+        if not signed.get("complete"):
+            raise RuntimeError(f"Transfer from {sender} not signed completely")
+        return self.api.checked_command("sendrawtransaction", signed["hex"], is_log=False)
+
+    def run_transfer(self, sender: str):
+        receiver = self.random.choice(self.addresses)
+        while receiver == sender:
+            receiver = self.random.choice(self.addresses)
+        start = perf_counter()
+        try:
+            tx_id = self.transfer(sender, receiver)
+        except Exception as e:
+            # any failure, including a lost connection, must return the sender to the pool
+            self.logger.error(f"Transfer from {sender} failed: {e}")
+            with self.condition:
+                self.failed += 1
+                self.release(sender)
+            return
+        now = perf_counter()
+        self.submit_latency.record(now - start)
+        with self.condition:
+            self.sent += 1
+            self.sent_at[tx_id] = now
+            self.incoming[tx_id] = (receiver, self.amount)
+            self.available[sender] -= self.amount
+            self.release(sender)
+            # the block watcher may have seen the transfer mined before it was recorded here
+            if tx_id in self.unmatched:
+                self.settle(tx_id, self.unmatched.pop(tx_id))
+
+    def settle(self, tx_id: str, confirmed_at: float):
+        """ Make a confirmed transfer spendable by its receiver. Call with the condition held. """
+        self.confirm_latency.record(max(confirmed_at - self.sent_at.pop(tx_id), 0.0))
+        receiver, amount = self.incoming.pop(tx_id)
+        self.available[receiver] += amount
+        if receiver in self.drained:
+            self.release(receiver)
+
+    def confirm(self, tx_id: str, now: float):
+        with self.condition:
+            if tx_id in self.sent_at:
+                self.settle(tx_id, now)
+            else:
+                self.unmatched[tx_id] = now
+
+    def watch_blocks(self):
+        """ Confirm the transfers in every new block until stopped. A failed call is retried, skipping no block. """
+        height = None
+        while not self.stopped.is_set():
+            try:
+                if height is None:
+                    height = self.api.checked_command("getblockcount", is_log=False)
+                blocks = self.api.wait_for_height(height + 1, timeout=RpcApi.MAX_POLL_DELAY)
+                now = perf_counter()
+                for block_height in range(height + 1, blocks + 1):
+                    block = self.api.checked_command("getblock", block_height, 1, is_log=False)
+                    for tx_id in block["tx"]:
+                        self.confirm(tx_id if isinstance(tx_id, str) else tx_id["txid"], now)
+                    height = block_height
+            except TimeoutError:
+                continue
+            except Exception as e:
+                self.logger.warning(f"Reading new blocks failed, retrying: {e}")
+                sleep(RpcApi.MAX_POLL_DELAY)
+
+    def run(self, duration: float = None, count: int = None, rate: float = None, confirm_timeout: float = 60) -> float:
+        """ Transfer for `duration` seconds or `count` transfers, at most `rate` per second; return the elapsed time.
+
+        Afterwards, wait up to `confirm_timeout` seconds for the sent transfers to be confirmed.
+        """
+        if duration is None and count is None:
+            raise ValueError("Asset load needs a duration or a count")
+        if not self.available:
+            self.load_balances()
+        with self.condition:
+            for address in self.addresses:
+                self.release(address)
+        watcher = threading.Thread(target=self.watch_blocks, name="AssetLoadBlocks", daemon=True)
+        watcher.start()
+        start = perf_counter()
+        end = start + duration if duration is not None else None
+        next_time = start
+        started = 0
+        pending: Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while (count is None or started < count) and (end is None or perf_counter() < end):
+                if rate:
+                    delay = next_time - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+                    next_time += 1 / rate
+                if len(pending) >= 2 * self.concurrency:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                sender = self.take_sender(RpcApi.MAX_POLL_DELAY)
+                if sender is None:
+                    if not pending and not self.sent_at:
+                        self.logger.error("No address has enough funds left")
+                        break
+                    continue
+                pending.add(executor.submit(self.run_transfer, sender))
+                started += 1
+            wait(pending)
+        elapsed = perf_counter() - start
+        try:
+            self.api.wait_until(lambda: not self.sent_at, confirm_timeout)
+        except TimeoutError:
+            self.logger.warning(f"{len(self.sent_at):,} transfers not confirmed after {confirm_timeout} sec")
+        self.stopped.set()
+        watcher.join()
+        self.unmatched.clear()
+        self.report(elapsed, rate)
+        return elapsed
+
+    def report(self, elapsed: float, rate: float = None):
+        target = f", target {rate:,.0f}" if rate else ""
+        self.logger.info(f"Sent {self.sent:,} transfers ({self.failed:,} failed) in {elapsed:.2f} sec"
+                         f" ({self.sent / elapsed if elapsed else 0:,.1f} tx/sec{target})")
+        for label, histogram in (("Submit", self.submit_latency), ("Confirmation", self.confirm_latency)):
+            summary = histogram.summary()
+            self.logger.info(f"{label} latency of {summary['count']:,} transfers (ms): mean {summary['mean']:.1f}, "
+                             + ', '.join(f"{key} {value:.1f}" for key, value in summary.items()
+                                         if key not in ("count", "mean")))
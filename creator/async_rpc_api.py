@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import json
+import logging
+import pprint
+from time import perf_counter
+
+import aiohttp
+
+from .chain import Chain
+from .metrics import CallMetrics
+from .rpc_api import RpcApi, RpcError
+
+log = logging.getLogger("creator.transport")
+
+
+class AsyncRpcApi:
+    """ asyncio counterpart of `RpcApi`, with at most `concurrency` calls in flight at any time.
+
+    Use it as an async context manager, which opens and closes the underlying HTTP session::
+
+        async with AsyncRpcApi(logger, "chain1", concurrency=50) as api:
+            tx_id = await api.command("publish", "stream1", "key1", "0123")
+    """
+
+    def __init__(self, logger: logging.Logger, chain_name: str, verbose=False, concurrency: int = 100,
+                 timeout: float = 60, metrics: CallMetrics = None):
+        self.logger = logger
+        self.metrics = metrics
+        self.chain = Chain(self.logger, chain_name)
+        self.config = self.chain.load_config("multichain.conf")
+        self.params = self.chain.load_config("params.dat")
+        self.url = f"http://localhost:{self.config.get('rpcport', self.params['default-rpc-port'])}"
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.request_ids = itertools.count(1)
+        self.semaphore: asyncio.Semaphore = None
+        self.session: aiohttp.ClientSession = None
+        log.setLevel(logging.INFO if verbose else logging.WARNING)
+
+    async def __aenter__(self) -> "AsyncRpcApi":
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(self.config["rpcuser"], self.config["rpcpassword"]),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.session.close()
+
+    async def command(self, cmd: str, *args, is_log: bool = True):
+        payload = {"method": cmd, "params": args, "id": next(self.request_ids), "chain_name": self.chain.name}
+        encoded = json.dumps(payload)
+        if is_log:
+            log.info(f"Request: {encoded}")
+        async with self.semaphore:
+            start = perf_counter()
+            async with self.session.post(self.url, data=encoded,
+                                         headers={"Content-Type": "application/json"}) as response:
+                reply = await response.json(content_type=None)
+            if self.metrics is not None:
+                self.metrics.record(cmd, perf_counter() - start, reply.get("error") is not None)
+        if is_log:
+            log.info(f"Response: {reply}")
+        if reply.get("error") is not None:
+            log.error(f"{cmd} failed: {reply['error']}")
+            return reply
+        return reply["result"]
+
+    async def print_command(self, cmd: str, *args, **kwargs):
+        result = await self.command(cmd, *args, **kwargs)
+        if self.logger.isEnabledFor(logging.DEBUG) and 'error' not in result:
+            for line in pprint.pformat(result).split('\n'):
+                self.logger.debug(line)
+        return result
+
+    async def print_tx_id(self, tx_id: str):
+        if isinstance(tx_id, str):
+            await self.print_command("getrawtransaction", tx_id, 1, is_log=False)
+
+    async def print_tx(self, cmd: str, *args, **kwargs):
+        tx_id = await self.command(cmd, *args, **kwargs)
+        await self.print_tx_id(tx_id)
+        return tx_id
+
+    async def wait_for_mining(self):
+        """ Wait for the next block, polling with the same backoff as `RpcApi.wait_until`. """
+        current_blocks = await self.command("getblockcount")
+        if isinstance(current_blocks, dict):
+            raise RpcError("getblockcount", current_blocks["error"])
+        self.logger.info(f"Current blocks: {current_blocks}, mining")
+        start = perf_counter()
+        delay = RpcApi.POLL_DELAY
+        while True:
+            blocks = await self.command("getblockcount", is_log=False)
+            # an error reply counts as not mined yet, like in RpcApi.wait_for_height
+            if isinstance(blocks, int) and blocks > current_blocks:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RpcApi.MAX_POLL_DELAY)
+        self.logger.info(f"Block {current_blocks + 1} mined after {perf_counter() - start:.2f} sec")
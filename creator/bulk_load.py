@@ -0,0 +1,139 @@
+import csv
+import json
+import logging
+import string
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from .rpc_api import RpcApi
+
+TX_OVERHEAD = 250
+ITEM_OVERHEAD = 80
+HEX_DIGITS = set(string.hexdigits)
+
+
+def read_items(path: Path, stream: str) -> Iterator[Dict[str, Any]]:
+    """ Read stream items for `stream` from a JSON lines or CSV file.
+
+    JSON lines hold objects with ``key`` or ``keys``, ``data`` in any form accepted by ``publish``, and optional
+    ``options``. CSV files have a header with ``key`` or ``keys`` (comma separated), ``data`` and optional
+    ``options`` columns; CSV data that is not hexadecimal is published as text.
+    """
+    with open(str(path), newline='') as f:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(f):
+                keys = row.get("keys") or row.get("key") or ""
+                data = row.get("data") or ""
+                if len(data) % 2 or not HEX_DIGITS.issuperset(data):
+                    data = {"text": data}
+                yield make_item(stream, keys.split(','), data, row.get("options"))
+        else:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    keys = record.get("keys", record.get("key", []))
+                    yield make_item(stream, keys if isinstance(keys, list) else [keys], record["data"],
+                                    record.get("options"))
+
+
+def make_item(stream: str, keys: List[str], data: Any, options: Optional[str]) -> Dict[str, Any]:
+    item = {"for": stream, "keys": [key for key in keys if key], "data": data}
+    if options:
+        item["options"] = options
+    return item
+
+
+def item_size(item: Dict[str, Any]) -> int:
+    """ Estimate the bytes an item adds to a transaction. """
+    data = item["data"]
+    if isinstance(data, str):
+        data_size = len(data) // 2
+    elif "text" in data:
+        data_size = len(data["text"].encode())
+    else:
+        data_size = len(json.dumps(data))
+    return ITEM_OVERHEAD + len(item["for"]) + sum(len(key) for key in item["keys"]) + data_size
+
+
+class TxLimits(NamedTuple):
+    """ The blockchain parameters that bound the items packed into one transaction. """
+    max_tx_size: int
+    max_items: int
+    max_item_size: int
+    max_keys: int
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "TxLimits":
+        return cls(params["max-std-tx-size"], params["max-std-op-returns-count"],
+                   params["max-std-op-return-size"], params["max-std-op-drops-count"] - 1)
+
+
+def pack(items: Iterable[Dict[str, Any]], limits: TxLimits) -> Iterator[List[Dict[str, Any]]]:
+    """ Group consecutive items into transactions that stay within `limits`. """
+    batch: List[Dict[str, Any]] = []
+    batch_size = TX_OVERHEAD
+    for item in items:
+        size = item_size(item)
+        if size - ITEM_OVERHEAD > limits.max_item_size or len(item["keys"]) > limits.max_keys:
+            raise ValueError(f"Item with keys {item['keys']} exceeds the chain limits ({size:,} bytes)")
+        if batch and (len(batch) >= limits.max_items or batch_size + size > limits.max_tx_size):
+            yield batch
+            batch = []
+            batch_size = TX_OVERHEAD
+        batch.append(item)
+        batch_size += size
+    if batch:
+        yield batch
+
+
+class BulkLoader:
+    """ Publish many stream items with ``createrawsendfrom``, several items per transaction.
+
+    Transactions are submitted by `concurrency` threads; at most twice that many are read ahead from the input.
+    """
+
+    def __init__(self, logger: logging.Logger, api: RpcApi, from_address: str = None, concurrency: int = 8):
+        self.logger = logger
+        self.api = api
+        self.concurrency = concurrency
+        self.from_address = from_address or api.checked_command("listpermissions", "send")[0]["address"]
+        self.limits = TxLimits.from_params(api.checked_command("getblockchainparams"))
+        self.tx_ids: List[str] = []
+        self.loaded = 0
+        self.failed = 0
+
+    def send(self, items: List[Dict[str, Any]]) -> str:
+        return self.api.checked_command("createrawsendfrom", self.from_address, {}, items, "send", is_log=False)
+
+    def collect(self, futures: Set[Future], items: Dict[Future, int]):
+        for future in futures:
+            count = items.pop(future)
+            try:
+                self.tx_ids.append(future.result())
+                self.loaded += count
+            except Exception as e:
+                # a dropped connection or timeout fails only this transaction, not the whole load
+                self.logger.error(f"Transaction of {count} items failed: {e}")
+                self.failed += count
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> float:
+        """ Publish `items` and return the elapsed time. """
+        self.tx_ids, self.loaded, self.failed = [], 0, 0
+        start = perf_counter()
+        pending: Dict[Future, int] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for batch in pack(items, self.limits):
+                if len(pending) >= 2 * self.concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self.collect(done, pending)
+                pending[executor.submit(self.send, batch)] = len(batch)
+            self.collect(set(pending), pending)
+        elapsed = perf_counter() - start
+        self.logger.info(f"Loaded {self.loaded:,} items in {len(self.tx_ids):,} transactions in {elapsed:.2f} sec"
+                         f" ({self.loaded / elapsed if elapsed else 0:,.0f} items/sec,"
+                         f" {len(self.tx_ids) / elapsed if elapsed else 0:,.1f} tx/sec)")
+        if self.failed:
+            self.logger.warning(f"{self.failed:,} items failed")
+        return elapsed
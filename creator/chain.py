@@ -1,43 +1,78 @@
 import logging
 import os
+import re
 import shlex
 import shutil
 import signal
+import socket
 import sys
+import tarfile
 from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from subprocess import Popen, call, STDOUT
-from time import sleep
-from typing import Any, Tuple, List
+from subprocess import PIPE, Popen, STDOUT, TimeoutExpired, call, run
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, Tuple, List
 
 import psutil
+import requests
+
+from .notify import BlockNotifyListener
+from .transport import RpcTransport
 
 
 class Chain:
-    def __init__(self, logger: logging.Logger, name: str = None):
+    STARTUP_TIMEOUT = 60
+    TEMPLATE_EXCLUDES = {".lock", "debug.log", "db.log"}
+
+    def __init__(self, logger: logging.Logger, name: str = None, datadir: Path = None):
         self.name = name
         self.logger = logger
         self.bindir: str = None
-        self.datadir = Path(os.environ["APPDATA"]) / "MultiChain" \
-            if sys.platform == "win32" else Path.home() / ".multichain"
+        self.datadir = datadir or (Path(os.environ["APPDATA"]) / "MultiChain"
+                                   if sys.platform == "win32" else Path.home() / ".multichain")
+        self.port: int = None
+        self.rpc_port: int = None
         self.warn = False
         self.stop = True
         self.debug: str = None
+        self.block_notify = False
+        self.notifier: BlockNotifyListener = None
+        self.startup_timeout = self.STARTUP_TIMEOUT
+        self.startup_time: float = None
+        self.template: str = None
+        self.protocol: int = None
 
     @property
     def path(self) -> Path:
         return self.datadir / self.name
 
-    def kill_multichaind_processes(self):
+    def load_config(self, config_name: str) -> Dict[str, str]:
+        """ Read the ``name = value`` settings of file `config_name` in the chain folder. """
+        self.logger.debug(f"load_config(config_name={config_name!r})")
+        config = {}
+        with open(str(self.path / config_name)) as f:
+            for line in f:
+                parts = line.split('#', 1)[0].split('=', 1)
+                if len(parts) == 2:
+                    config[parts[0].strip()] = parts[1].strip()
+        return config
+
+    def kill_multichaind_processes(self, timeout: float = 2):
         def cmdline2str(p: psutil.Process) -> str:
             return ' '.join(shlex.quote(arg) for arg in p.cmdline())
 
+        def is_own_daemon(cmdline: List[str]) -> bool:
+            if len(cmdline) < 2 or cmdline[0] != "multichaind" or cmdline[1].split('@')[0] != self.name:
+                return False
+            datadirs = [arg.split('=', 1)[1] for arg in cmdline if arg.lstrip('-').startswith("datadir=")]
+            return not datadirs or Path(datadirs[-1]) == Path(self.datadir)
+
         processes = [p for p in psutil.process_iter(attrs=("cmdline",)) if
-                     p.info["cmdline"] and p.info["cmdline"][:2] == ["multichaind", self.name]]
+                     p.info["cmdline"] and is_own_daemon(p.info["cmdline"])]
         for p in processes:
             self.logger.info(f"Terminating process {p.pid}: {cmdline2str(p)}")
             p.send_signal(signal.SIGTERM)
-        gone, alive = psutil.wait_procs(processes, timeout=2)
+        gone, alive = psutil.wait_procs(processes, timeout=timeout)
         for p in alive:
             self.logger.info(f"Killing process {p.pid}: {cmdline2str(p)}")
             p.kill()
@@ -52,6 +87,13 @@ class Chain:
                            help="chain name  (default: %(default)s)"
                                 " (will overwrite existing unless -w/--warn is also specified)")
         group.add_argument("-w", "--warn", action="store_true", help="warn and exit if named chain already exists")
+        group.add_argument("--startup-timeout", type=float, metavar="SEC", default=Chain.STARTUP_TIMEOUT,
+                           help="seconds to wait for a new daemon to answer RPC calls (default: %(default)s)")
+        group.add_argument("--template", metavar="NAME",
+                           help="restore the populated chain from template NAME if it exists,"
+                                " otherwise build the chain and save it as template NAME")
+        group.add_argument("--block-notify", action="store_true",
+                           help="have a newly created daemon notify this script of new blocks and transactions")
         parser.add_argument("--no-stop", dest="stop", action="store_false", help="don't stop daemon at end of script")
         parser.add_argument("-v", "--verbose", action="store_true", help="write debug messages to Python log")
         parser.add_argument("-d", "--debug", metavar="CATEGORIES", nargs="?", default=None, const="all",
@@ -63,13 +105,16 @@ class Chain:
         if options.verbose:
             self.logger.setLevel(logging.DEBUG)
         if options.datadir:
-            self.datadir = options.datadir
+            self.datadir = Path(options.datadir)
         if options.bindir:
             self.bindir = options.bindir
         self.name = options.chain
         self.warn = options.warn
         self.stop = options.stop
         self.debug = options.debug
+        self.block_notify = options.block_notify
+        self.startup_timeout = options.startup_timeout
+        self.template = options.template
 
         if self.bindir:
             option_display.append(("Binaries", self.bindir))
@@ -78,6 +123,9 @@ class Chain:
         option_display.append(("Warn", self.warn))
         option_display.append(("Stop daemon", self.stop))
         option_display.append(("Debug", self.debug))
+        option_display.append(("Startup timeout", self.startup_timeout))
+        option_display.append(("Template", self.template))
+        option_display.append(("Block notify", self.block_notify))
         return option_display
 
     def log_options(self, parser: ArgumentParser, option_display: List[Tuple[str, Any]]):
@@ -86,11 +134,61 @@ class Chain:
         for label, value in option_display:
             self.logger.info(f"  {label + ':':{label_width}} {value}")
 
+    def template_path(self, template: str) -> Path:
+        return self.datadir / "templates" / f"{template}.tar.gz"
+
+    def save_template(self, template: str) -> Path:
+        """ Stop the daemon and archive the chain folder as `template`. """
+        self.logger.debug(f"save_template(template={template!r})")
+        self.kill_multichaind_processes(timeout=self.startup_timeout)
+        path = self.template_path(template)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        start = perf_counter()
+        with tarfile.open(str(path), "w:gz", compresslevel=1) as tar:
+            tar.add(str(self.path), arcname=self.name,
+                    filter=lambda info: None if Path(info.name).name in self.TEMPLATE_EXCLUDES else info)
+        self.logger.info(f"Saved template {path} in {perf_counter() - start:.2f} sec")
+        return path
+
+    def restore_template(self, template: str) -> Popen:
+        """ Replace the chain folder with the contents of `template` and start the daemon.
+
+        MultiChain binds the chain name into params.dat, so a template can only be restored under the chain name
+        it was saved with, but into any datadir.
+        """
+        self.logger.debug(f"restore_template(template={template!r})")
+        if self.path.exists():
+            self.kill_multichaind_processes()
+            self.logger.info(f">>> Remove {self.path}")
+            shutil.rmtree(self.path)
+        start = perf_counter()
+        with tarfile.open(str(self.template_path(template))) as tar:
+            names = {Path(name).parts[0] for name in tar.getnames()}
+            if names != {self.name}:
+                raise ValueError(f"Template '{template}' holds chain {sorted(names)}, not '{self.name}'")
+            self.datadir.mkdir(parents=True, exist_ok=True)
+            tar.extractall(str(self.datadir))
+        self.logger.info(f"Restored template '{template}' in {perf_counter() - start:.2f} sec")
+        return self.start()
+
+    def create_from_template(self, populate: Callable[[], Any]) -> Popen:
+        """ Restore the chain from `template` if it was saved before, otherwise create it and call `populate`.
+
+        `populate` fills a newly created chain and should wait until its transactions are mined. The result is
+        saved as `template` for the next run.
+        """
+        if self.template and self.template_path(self.template).exists():
+            return self.restore_template(self.template)
+        proc = self.create()
+        populate()
+        if self.template:
+            self.save_template(self.template)
+            proc = self.start()
+        return proc
+
     def create(self) -> Popen:
         self.logger.debug(f"create()")
-        if self.bindir:
-            os.environ["PATH"] = os.pathsep.join([self.bindir, os.environ["PATH"]])
-            self.logger.info(f'>>> Set $PATH={os.environ["PATH"]}')
+        self.set_path()
         if self.path.exists():
             if self.warn:
                 message = f"Chain '{self.name}' already exists. Please choose another name."
@@ -101,12 +199,59 @@ class Chain:
             self.logger.info(f">>> Remove {self.path}")
             shutil.rmtree(self.path)
 
-        cmd = ["multichain-util", "create", self.name, f"--datadir={self.datadir}"]
+        cmd = ["multichain-util", "create", self.name]
+        if self.protocol:
+            cmd.append(str(self.protocol))
+        cmd.append(f"--datadir={self.datadir}")
         self.logger.info(f">>> {' '.join(cmd)}")
+        start = perf_counter()
         call(cmd)
-        sleep(1)
+        self.wait_until(lambda: (self.path / "params.dat").exists() and (self.path / "multichain.conf").exists(),
+                        start + self.startup_timeout, "chain configuration files")
+        return self.start()
+
+    def set_path(self):
+        """ Put `bindir` first on $PATH, so the MultiChain binaries there are run. """
+        paths = os.environ["PATH"].split(os.pathsep)
+        if self.bindir and paths[0] != self.bindir:
+            os.environ["PATH"] = os.pathsep.join([self.bindir] + paths)
+            self.logger.info(f'>>> Set $PATH={os.environ["PATH"]}')
+
+    def daemon_command(self, target: str) -> List[str]:
+        self.set_path()
+        cmd = ["multichaind", target, "-autosubscribe=assets,streams", f"--datadir={self.datadir}"]
+        if self.port:
+            cmd.append(f"-port={self.port}")
+        if self.rpc_port:
+            cmd.append(f"-rpcport={self.rpc_port}")
+        return cmd
+
+    def join(self, seed: str) -> str:
+        """ Initialize this node from the seed node at `seed` (``host:port``) and return the node address.
+
+        The seed has not granted connect permission yet, so multichaind exits after initializing the node;
+        the address to grant is taken from its output.
+        """
+        self.datadir.mkdir(parents=True, exist_ok=True)
+        cmd = self.daemon_command(f"{self.name}@{seed}")
+        self.logger.info(f">>> {' '.join(cmd)}")
+        try:
+            output = run(cmd, stdout=PIPE, stderr=STDOUT, timeout=self.startup_timeout,
+                         universal_newlines=True).stdout
+        except TimeoutExpired:
+            raise TimeoutError(f"Chain '{self.name}': node in {self.datadir} did not initialize"
+                               f" within {self.startup_timeout} sec")
+        match = re.search(r"grant (\w+) connect", output)
+        if not match:
+            raise RuntimeError(f"Chain '{self.name}': unexpected output while joining {seed}:\n{output}")
+        if self.rpc_port:
+            with open(str(self.path / "multichain.conf"), "a") as f:
+                f.write(f"rpcport={self.rpc_port}\n")
+        return match.group(1)
 
-        cmd = ["multichaind", self.name, "-autosubscribe=assets,streams", f"--datadir={self.datadir}"]
+    def start(self) -> Popen:
+        """ Start the daemon and wait until it answers RPC calls. """
+        cmd = self.daemon_command(self.name)
         if sys.platform != "win32":
             cmd.append("-daemon")
         if self.debug:
@@ -114,7 +259,58 @@ class Chain:
             if self.debug != "all":
                 arg += f"={self.debug}"
             cmd.append(arg)
+        if self.block_notify:
+            self.notifier = BlockNotifyListener()
+            cmd.extend(self.notifier.daemon_args)
         self.logger.info(f">>> {' '.join(cmd)}")
         proc = Popen(cmd, stderr=STDOUT, close_fds=True)
-        sleep(5)
+        self.wait_until_ready(proc)
         return proc
+
+    def wait_until(self, condition, deadline: float, what: str, proc: Popen = None):
+        """ Poll `condition` with backoff until it is true, or raise `TimeoutError` at `deadline`. """
+        delay = 0.02
+        while not condition():
+            if proc is not None and proc.poll():
+                raise RuntimeError(f"multichaind exited with code {proc.returncode} while waiting for {what}")
+            if perf_counter() >= deadline:
+                raise TimeoutError(f"Chain '{self.name}': no {what} after {self.startup_timeout} sec")
+            sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def wait_until_ready(self, proc: Popen = None):
+        """ Wait until the daemon accepts connections on its RPC port and `getinfo` succeeds. """
+        start = perf_counter()
+        deadline = start + self.startup_timeout
+        params = self.load_config("params.dat")
+        config = self.load_config("multichain.conf")
+        port = int(config.get("rpcport", params["default-rpc-port"]))
+
+        def port_open() -> bool:
+            try:
+                socket.create_connection(("localhost", port), timeout=0.5).close()
+                return True
+            except OSError:
+                return False
+
+        self.wait_until(port_open, deadline, f"RPC listener on port {port}", proc)
+        port_time = perf_counter() - start
+
+        transport = RpcTransport(f"http://localhost:{port}", (config["rpcuser"], config["rpcpassword"]), self.name,
+                                 pool_size=1, timeout=(1, 5), retries=0)
+
+        def getinfo_ok() -> bool:
+            try:
+                reply = transport.post({"method": "getinfo", "params": [], "id": 1, "chain_name": self.name},
+                                       is_log=False)
+            except (requests.RequestException, ValueError):
+                return False
+            return reply.get("error") is None
+
+        try:
+            self.wait_until(getinfo_ok, deadline, "successful getinfo", proc)
+        finally:
+            transport.close()
+        self.startup_time = perf_counter() - start
+        self.logger.info(f"Chain '{self.name}' ready in {self.startup_time:.2f} sec"
+                         f" (RPC port open after {port_time:.2f} sec)")
@@ -0,0 +1,77 @@
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import List
+
+from .chain import Chain
+from .rpc_api import RpcApi
+
+NODE_PERMISSIONS = "connect,send,receive"
+
+
+class Cluster:
+    """ A seed chain plus `size` additional nodes of the same chain, all running on this host.
+
+    Every node is a `Chain` with its own datadir under `root` (node0 is the seed) and its own network and RPC
+    ports, starting at `base_port`. Nodes are initialized, started and stopped concurrently.
+    """
+
+    def __init__(self, logger: logging.Logger, seed: Chain, size: int, root: Path = None, base_port: int = None):
+        self.logger = logger
+        self.seed = seed
+        self.size = size
+        self.root = root or seed.datadir / f"{seed.name}-cluster"
+        self.base_port = base_port
+        self.nodes: List[Chain] = []
+        self.apis: List[RpcApi] = []
+
+    def make_node(self, index: int, base_port: int) -> Chain:
+        node = Chain(self.logger, self.seed.name, self.root / f"node{index}")
+        node.bindir = self.seed.bindir
+        node.debug = self.seed.debug
+        node.startup_timeout = self.seed.startup_timeout
+        node.port = base_port + 2 * index
+        node.rpc_port = base_port + 2 * index + 1
+        return node
+
+    def create(self) -> List[RpcApi]:
+        """ Create the seed chain, join and start all nodes, and return an RpcApi per node (seed first). """
+        start = perf_counter()
+        self.seed.create()
+        seed_api = RpcApi(self.logger, self.seed.name, datadir=self.seed.datadir)
+        seed_api.adjust_config()
+        seed_port = int(seed_api.params["default-network-port"])
+        base_port = self.base_port or seed_port + 10
+        self.nodes = [self.make_node(index, base_port) for index in range(1, self.size + 1)]
+        if self.root.exists():
+            for node in self.nodes:
+                node.kill_multichaind_processes()
+            self.logger.info(f">>> Remove {self.root}")
+            shutil.rmtree(self.root)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.size)) as executor:
+            addresses = list(executor.map(lambda node: node.join(f"127.0.0.1:{seed_port}"), self.nodes))
+            if addresses:
+                seed_api.print_tx("grant", ','.join(addresses), NODE_PERMISSIONS)
+            list(executor.map(lambda node: node.start(), self.nodes))
+            self.apis = [seed_api] + list(executor.map(
+                lambda node: RpcApi(self.logger, node.name, datadir=node.datadir), self.nodes))
+            list(executor.map(self.wait_for_peers, self.apis[1:]))
+        self.logger.info(f"Cluster of {self.size + 1} nodes ready in {perf_counter() - start:.2f} sec")
+        return self.apis
+
+    @staticmethod
+    def wait_for_peers(api: RpcApi):
+        def connected() -> bool:
+            info = api.command("getinfo", is_log=False)
+            # a node still loading answers with an error, which only means it is not ready yet
+            return isinstance(info, dict) and info.get("error") is None and info.get("connections", 0) > 0
+        api.wait_until(connected, timeout=api.chain.startup_timeout)
+
+    def stop(self):
+        """ Stop all nodes in parallel. """
+        self.logger.info(f"Stopping {len(self.nodes) + 1} nodes")
+        with ThreadPoolExecutor(max_workers=len(self.nodes) + 1) as executor:
+            list(executor.map(lambda chain: chain.kill_multichaind_processes(), [self.seed] + self.nodes))
@@ -0,0 +1,142 @@
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from .rpc_api import RpcApi
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FORMATS = {"jsonl": ".jsonl.gz", "parquet": ".parquet"}
+PARQUET_COLUMNS = ["txid", "vout", "keys", "publishers", "offchain", "available", "confirmations", "blocktime",
+                   "data"]
+
+
+def path_name(name: str) -> str:
+    """ Encode a stream name or key as a single path component; ``.`` and ``..`` are escaped too. """
+    encoded = quote(name, safe="")
+    return encoded.replace(".", "%2E") if not encoded.strip(".") else encoded
+
+
+class StreamExporter:
+    """ Dump streams, or the items of some keys of a stream, into compressed part files.
+
+    Every export unit (a stream, or a stream and key) is split into pages of `page_size` items, which are fetched
+    by `workers` threads and written as one part file each under `output`. Completed parts are recorded in
+    ``checkpoint.json``, so an interrupted export resumes with the missing parts only. Part numbers only mean
+    something with the same page size and format, so resuming with others raises `ValueError`.
+    """
+
+    def __init__(self, logger: logging.Logger, api: RpcApi, output: Path, file_format: str = "jsonl",
+                 page_size: int = RpcApi.DEFAULT_PAGE_SIZE, workers: int = 4):
+        if file_format == "parquet" and pyarrow is None:
+            raise ValueError("Parquet output requires the pyarrow package")
+        self.logger = logger
+        self.api = api
+        self.output = output
+        self.file_format = file_format
+        self.page_size = page_size
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.checkpoint_path = output / "checkpoint.json"
+        self.checkpoint: Dict[str, Dict[str, Any]] = {}
+        if self.checkpoint_path.exists():
+            with open(str(self.checkpoint_path)) as f:
+                saved = json.load(f)
+            if (saved.get("page_size"), saved.get("format")) != (page_size, file_format):
+                raise ValueError(f"{self.checkpoint_path} is for page size {saved.get('page_size')} and format"
+                                 f" {saved.get('format')}; resume with those or export to another folder")
+            self.checkpoint = saved["units"]
+
+    @staticmethod
+    def unit_name(stream: str, key: Optional[str]) -> str:
+        return stream if key is None else f"{stream}/{key}"
+
+    def item_count(self, stream: str, key: Optional[str]) -> int:
+        if key is None:
+            return self.api.checked_command("liststreams", stream)[0]["items"]
+        found = self.api.checked_command("liststreamkeys", stream, key)
+        return found[0]["items"] if found else 0
+
+    def plan(self, stream: str, key: Optional[str]) -> Dict[str, Any]:
+        """ Get the checkpoint entry of a unit, creating it with the current item count on the first run. """
+        name = self.unit_name(stream, key)
+        unit = self.checkpoint.get(name)
+        if unit is None:
+            unit = {"stream": stream, "key": key, "items": self.item_count(stream, key), "done": []}
+            self.checkpoint[name] = unit
+        return unit
+
+    def part_path(self, unit: Dict[str, Any], page: int) -> Path:
+        folder = self.output / path_name(unit["stream"])
+        if unit["key"] is not None:
+            folder = folder / "keys" / path_name(unit["key"])
+        return folder / f"part-{page:05}{FORMATS[self.file_format]}"
+
+    def fetch(self, unit: Dict[str, Any], page: int) -> List[Dict[str, Any]]:
+        start = page * self.page_size
+        count = min(self.page_size, unit["items"] - start)
+        if unit["key"] is None:
+            return self.api.checked_command("liststreamitems", unit["stream"], False, count, start, is_log=False)
+        return self.api.checked_command("liststreamkeyitems", unit["stream"], unit["key"], False, count, start,
+                                        is_log=False)
+
+    def write(self, path: Path, items: List[Dict[str, Any]]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        if self.file_format == "jsonl":
+            with gzip.open(str(temp_path), "wt", compresslevel=6) as f:
+                for item in items:
+                    f.write(json.dumps(item) + '\n')
+        else:
+            columns = {column: [item.get(column) for item in items] for column in PARQUET_COLUMNS}
+            columns["data"] = [json.dumps(data) for data in columns["data"]]
+            pyarrow.parquet.write_table(pyarrow.table(columns), str(temp_path))
+        os.replace(str(temp_path), str(path))
+
+    def export_page(self, unit: Dict[str, Any], page: int) -> int:
+        items = self.fetch(unit, page)
+        self.write(self.part_path(unit, page), items)
+        with self.lock:
+            unit["done"].append(page)
+            self.save_checkpoint()
+        return len(items)
+
+    def save_checkpoint(self):
+        self.output.mkdir(parents=True, exist_ok=True)
+        temp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(str(temp_path), "w") as f:
+            json.dump({"page_size": self.page_size, "format": self.file_format, "units": self.checkpoint}, f)
+        os.replace(str(temp_path), str(self.checkpoint_path))
+
+    def export(self, streams: List[str], keys: List[str] = None) -> int:
+        """ Export `streams` (only the items of `keys`, if given) and return the number of items written. """
+        units = [self.plan(stream, key) for stream in streams for key in (keys or [None])]
+        self.save_checkpoint()
+        tasks = []
+        for unit in units:
+            pages = math.ceil(unit["items"] / self.page_size)
+            done = set(unit["done"])
+            missing = [page for page in range(pages) if page not in done]
+            self.logger.info(f"{self.unit_name(unit['stream'], unit['key'])}: {unit['items']:,} items,"
+                             f" {len(missing)} of {pages} parts to export")
+            tasks.extend((unit, page) for page in missing)
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            exported = sum(executor.map(lambda task: self.export_page(*task), tasks))
+        elapsed = perf_counter() - start
+        self.logger.info(f"Exported {exported:,} items in {len(tasks)} parts in {elapsed:.2f} sec"
+                         f" ({exported / elapsed if elapsed else 0:,.0f} items/sec)")
+        return exported
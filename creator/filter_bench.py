@@ -0,0 +1,143 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .metrics import Histogram
+from .rpc_api import RpcApi
+
+PASSED = "pass"
+REJECTED = "reject"
+TIMEOUT = "timeout"
+NOT_COMPILED = "not-compiled"
+ERROR = "error"
+OUTCOMES = [PASSED, REJECTED, TIMEOUT, NOT_COMPILED, ERROR]
+
+
+def classify(result: Any) -> str:
+    """ Get the outcome of a ``testtxfilter`` or ``runtxfilter`` result. """
+    if not isinstance(result, dict) or result.get("error") is not None:
+        return ERROR
+    if not result.get("compiled", True):
+        return NOT_COMPILED
+    if result.get("passed"):
+        return PASSED
+    return TIMEOUT if "timeout" in (result.get("reason") or "").lower() else REJECTED
+
+
+def corpus_from_stream(api: RpcApi, stream: str, limit: int = None) -> List[str]:
+    """ Get the hex of the distinct transactions that published the first `limit` items of `stream`. """
+    tx_ids = []
+    seen = set()
+    for item in api.iter_stream_items(stream):
+        if item["txid"] not in seen:
+            seen.add(item["txid"])
+            tx_ids.append(item["txid"])
+            if limit is not None and len(tx_ids) >= limit:
+                break
+    results = api.command_batch([("getrawtransaction", tx_id) for tx_id in tx_ids])
+    return [result.result for result in results if result.error is None]
+
+
+def corpus_from_file(path: Path, limit: int = None) -> List[str]:
+    """ Read transaction hex strings, one per line; blank lines and lines starting with '#' are skipped. """
+    corpus = []
+    with open(str(path)) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                corpus.append(line)
+                if limit is not None and len(corpus) >= limit:
+                    break
+    return corpus
+
+
+class FilterSpec(NamedTuple):
+    """ A filter to evaluate: `script` with `restrictions` via ``testtxfilter``, or a created filter `name`. """
+    label: str
+    script: Optional[str] = None
+    restrictions: Optional[Dict[str, Any]] = None
+    name: Optional[str] = None
+
+
+class FilterReport:
+    """ Outcomes and timing of evaluating one filter over a corpus. """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.filter_time = Histogram()
+        self.call_latency = Histogram()
+        self.passed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.not_compiled = 0
+        self.errors = 0
+        self.reasons: Dict[str, int] = {}
+
+    @property
+    def evaluations(self) -> int:
+        return self.passed + self.rejected + self.timeouts
+
+    def record(self, result: Any, latency: float):
+        self.call_latency.record(latency)
+        outcome = classify(result)
+        if outcome == ERROR:
+            self.errors += 1
+        elif outcome == NOT_COMPILED:
+            self.not_compiled += 1
+        else:
+            self.filter_time.record(result.get("time") or 0.0)
+            if outcome == PASSED:
+                self.passed += 1
+            elif outcome == TIMEOUT:
+                self.timeouts += 1
+            else:
+                self.rejected += 1
+                reason = result.get("reason") or ""
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"filter": self.label, "evaluations": self.evaluations, "passed": self.passed,
+                "rejected": self.rejected, "timeouts": self.timeouts, "not_compiled": self.not_compiled,
+                "errors": self.errors,
+                "rejection_rate": self.rejected / self.evaluations if self.evaluations else 0.0,
+                "filter_time": self.filter_time.summary(), "call_latency": self.call_latency.summary(),
+                "reasons": self.reasons}
+
+    def log(self, logger: logging.Logger):
+        data = self.to_dict()
+        logger.info(f"{self.label}: {self.evaluations:,} evaluations, {self.passed:,} passed, {self.rejected:,}"
+                    f" rejected ({data['rejection_rate']:.1%}), {self.timeouts:,} timeouts,"
+                    f" {self.not_compiled:,} not compiled, {self.errors:,} errors")
+        for name, summary in (("filter time", data["filter_time"]), ("call latency", data["call_latency"])):
+            logger.info(f"  {name:12} mean {summary['mean']:8.2f} ms, p50 {summary['p50']:8.2f} ms,"
+                        f" p99 {summary['p99']:8.2f} ms, max {summary['max']:8.2f} ms")
+        for reason, count in sorted(self.reasons.items(), key=lambda item: -item[1])[:5]:
+            logger.info(f"  {count:8,} x {reason}")
+
+
+class FilterBenchmark:
+    """ Evaluate filters over a corpus of transactions, `concurrency` calls at a time. """
+
+    def __init__(self, logger: logging.Logger, api: RpcApi, concurrency: int = 8):
+        self.logger = logger
+        self.api = api
+        self.concurrency = concurrency
+
+    def evaluate(self, spec: FilterSpec, tx_hex: str):
+        start = perf_counter()
+        if spec.name is not None:
+            result = self.api.command("runtxfilter", spec.name, tx_hex, is_log=False)
+        else:
+            result = self.api.command("testtxfilter", spec.restrictions or {}, spec.script, tx_hex, is_log=False)
+        return result, perf_counter() - start
+
+    def run(self, spec: FilterSpec, corpus: List[str]) -> FilterReport:
+        report = FilterReport(spec.label)
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for result, latency in executor.map(lambda tx_hex: self.evaluate(spec, tx_hex), corpus):
+                report.record(result, latency)
+        self.logger.debug(f"{spec.label}: {len(corpus):,} transactions in {perf_counter() - start:.2f} sec")
+        return report
@@ -0,0 +1,136 @@
+""" Run every filter script of a suite against every fixture transaction and compare with the expected outcomes.
+
+A suite is a folder of ``*.js`` filter scripts plus ``suite.json``::
+
+    {
+        "fixtures": {"publish1": {"stream": "stream1", "keys": ["key1"], "data": "0102"},
+                     "external": {"hex": "0100..."}},
+        "restrictions": {"good": {"for": "stream1"}},
+        "expected": {"good": {"*": "pass"}, "infinite": {"*": "timeout", "external": "error"}}
+    }
+
+Fixtures are published once and their raw hex is cached under the suite's ``.fixtures`` folder, keyed by a hash
+of the fixture and the chain's genesis block, so later runs on the same chain do not publish anything.
+Expected outcomes are those of `filter_bench.classify`; ``"*"`` applies to the fixtures not listed.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .filter_bench import classify
+from .rpc_api import RpcApi
+
+FIXTURE_TIMEOUT = 60
+
+
+class Cell(NamedTuple):
+    script: str
+    fixture: str
+    expected: Optional[str]
+    outcome: str
+    time: float
+    reason: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.expected is None or self.outcome == self.expected
+
+
+class FilterMatrix:
+    def __init__(self, logger: logging.Logger, api: RpcApi, suite: Path, cache: Path = None, concurrency: int = 8):
+        self.logger = logger
+        self.api = api
+        self.cache = cache or suite / ".fixtures"
+        self.concurrency = concurrency
+        with open(str(suite / "suite.json")) as f:
+            spec = json.load(f)
+        self.fixtures: Dict[str, Dict[str, Any]] = spec["fixtures"]
+        self.restrictions: Dict[str, Dict[str, Any]] = spec.get("restrictions", {})
+        self.expected: Dict[str, Dict[str, str]] = spec.get("expected", {})
+        self.scripts = {path.stem: path.read_text() for path in sorted(suite.glob("*.js"))}
+
+    def fixture_path(self, fixture: Dict[str, Any], genesis: str) -> Path:
+        digest = hashlib.sha256(f"{genesis}:{json.dumps(fixture, sort_keys=True)}".encode()).hexdigest()
+        return self.cache / f"{digest}.hex"
+
+    @staticmethod
+    def publish_call(fixture: Dict[str, Any]) -> tuple:
+        call = ("publish", fixture["stream"], fixture.get("keys", []), fixture["data"])
+        return call + (fixture["options"],) if "options" in fixture else call
+
+    def prepare_fixtures(self) -> Dict[str, str]:
+        """ Get the raw hex of every fixture, publishing only those that are not cached yet. """
+        genesis = self.api.checked_command("getblockhash", 0)
+        hexes = {}
+        missing = []
+        for name, fixture in self.fixtures.items():
+            path = self.fixture_path(fixture, genesis)
+            if "hex" in fixture:
+                hexes[name] = fixture["hex"]
+            elif path.exists():
+                hexes[name] = path.read_text()
+            else:
+                missing.append(name)
+        self.logger.info(f"{len(hexes)} fixtures cached, {len(missing)} to publish")
+        if not missing:
+            return hexes
+
+        existing = {stream["name"] for stream in self.api.checked_command("liststreams", is_log=False)}
+        for stream in sorted({self.fixtures[name]["stream"] for name in missing} - existing):
+            tx_id = self.api.checked_command("create", "stream", stream, True)
+            self.api.wait_for_tx(tx_id, timeout=FIXTURE_TIMEOUT)
+        published = self.api.command_batch([self.publish_call(self.fixtures[name]) for name in missing])
+        self.cache.mkdir(parents=True, exist_ok=True)
+        for name, result in zip(missing, published):
+            if result.error is not None:
+                raise RuntimeError(f"Fixture {name}: publish failed: {result.error.get('message')}")
+            hexes[name] = self.api.get_raw_transaction(result.result)
+            self.fixture_path(self.fixtures[name], genesis).write_text(hexes[name])
+        return hexes
+
+    def expected_outcome(self, script: str, fixture: str) -> Optional[str]:
+        expected = self.expected.get(script, {})
+        return expected.get(fixture, expected.get("*"))
+
+    def evaluate(self, script: str, fixture: str, tx_hex: str) -> Cell:
+        start = perf_counter()
+        result = self.api.command("testtxfilter", self.restrictions.get(script, {}), self.scripts[script], tx_hex,
+                                  is_log=False)
+        elapsed = perf_counter() - start
+        reason = result.get("reason") if isinstance(result, dict) else None
+        if isinstance(result, dict) and result.get("error") is not None:
+            reason = result["error"].get("message")
+        return Cell(script, fixture, self.expected_outcome(script, fixture), classify(result), elapsed, reason)
+
+    def run(self) -> List[Cell]:
+        """ Evaluate all scripts against all fixtures, `concurrency` calls at a time. """
+        hexes = self.prepare_fixtures()
+        pairs = [(script, fixture) for script in self.scripts for fixture in self.fixtures]
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            cells = list(executor.map(lambda pair: self.evaluate(pair[0], pair[1], hexes[pair[1]]), pairs))
+        self.logger.info(f"Evaluated {len(self.scripts)} scripts x {len(self.fixtures)} fixtures"
+                         f" in {perf_counter() - start:.2f} sec")
+        return cells
+
+    def log_table(self, cells: List[Cell]):
+        """ Log a row per script with the outcome and time (ms) per fixture; mismatches are marked with '!'. """
+        fixtures = list(self.fixtures)
+        width = max([len(name) for name in fixtures] + [16])
+        script_width = max([len(name) for name in self.scripts] + [6])
+        self.logger.info(f"{'script':{script_width}} " + ' '.join(f"{name:>{width}}" for name in fixtures))
+        by_pair = {(cell.script, cell.fixture): cell for cell in cells}
+        for script in self.scripts:
+            values = []
+            for fixture in fixtures:
+                cell = by_pair[(script, fixture)]
+                values.append(f"{('' if cell.ok else '!') + cell.outcome} {cell.time * 1000:.1f}".rjust(width))
+            self.logger.info(f"{script:{script_width}} " + ' '.join(values))
+        for cell in cells:
+            if not cell.ok:
+                self.logger.warning(f"{cell.script} x {cell.fixture}: expected {cell.expected}, got {cell.outcome}"
+                                    f" ({cell.reason})")
@@ -0,0 +1,31 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+
+KeyPair = Dict[str, str]
+
+
+def load_keystore(path: Path, chain_id: str) -> List[KeyPair]:
+    """ Read the keypairs (``address``, ``pubkey``, ``privkey``) saved in `path`, or none if it does not exist.
+
+    `chain_id` is the genesis block hash of the chain the keypairs are for. Raise `ValueError` if they were saved
+    for another chain, such as an earlier chain with the same name.
+    """
+    if not path.exists():
+        return []
+    with open(str(path)) as f:
+        keystore = json.load(f)
+    if keystore.get("chain") != chain_id:
+        raise ValueError(f"Keystore {path} belongs to chain {keystore.get('chain')}, not {chain_id}")
+    return keystore["keypairs"]
+
+
+def save_keystore(path: Path, chain_id: str, keypairs: List[KeyPair]):
+    """ Write `keypairs` of chain `chain_id` to `path`, readable by the owner only. The file is replaced atomically. """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    fd = os.open(str(temp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"chain": chain_id, "keypairs": keypairs}, f, indent=1)
+    os.replace(str(temp_path), str(path))
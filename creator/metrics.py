@@ -0,0 +1,195 @@
+import json
+import logging
+import threading
+from time import perf_counter, time
+from typing import Any, Dict, List, Tuple
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_MAGNITUDE = 40
+PERCENTILES: List[Tuple[str, float]] = [("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999)]
+
+
+class Histogram:
+    """ Fixed-bucket latency histogram in the style of HdrHistogram.
+
+    Latencies are recorded in microseconds into log-linear buckets: every power of two is split into
+    `SUB_BUCKETS` equal buckets, so values are kept with about 3% relative precision up to 2**40 us.
+    Recording is a few integer operations and never allocates.
+    """
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_MAGNITUDE - SUB_BUCKET_BITS + 2) * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket_index(micros: int) -> int:
+        if micros < SUB_BUCKETS:
+            return micros
+        shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+        return (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def bucket_value(index: int) -> int:
+        """ Get the highest value (in microseconds) that falls into bucket `index`. """
+        if index < SUB_BUCKETS:
+            return index
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        index = min(self.bucket_index(int(seconds * 1e6)), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "Histogram"):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        """ Get the `fraction` percentile (0 < fraction <= 1) in seconds. """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bucket_value(index) / 1e6, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """ Get count, mean, max and percentiles, with latencies in milliseconds. """
+        summary = {"count": self.count, "mean": self.mean * 1000, "max": self.max * 1000}
+        for label, fraction in PERCENTILES:
+            summary[label] = self.percentile(fraction) * 1000
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """ Get a compact, picklable and JSON-friendly form of the histogram. """
+        return {"counts": {index: count for index, count in enumerate(self.counts) if count},
+                "total": self.total, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls()
+        for index, count in data["counts"].items():
+            histogram.counts[int(index)] += count
+            histogram.count += count
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class CallMetrics:
+    """ Per-method call counts, error counts and latency histograms of JSON-API commands. Thread safe. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods: Dict[str, MethodStats] = {}
+        self.started = perf_counter()
+
+    def record(self, method: str, seconds: float, error: bool = False):
+        with self.lock:
+            stats = self.methods.get(method)
+            if stats is None:
+                stats = self.methods[method] = MethodStats()
+            stats.calls += 1
+            stats.latency.record(seconds)
+            if error:
+                stats.errors += 1
+
+    def merge(self, other: "CallMetrics"):
+        with self.lock:
+            for method, other_stats in other.methods.items():
+                stats = self.methods.setdefault(method, MethodStats())
+                stats.calls += other_stats.calls
+                stats.errors += other_stats.errors
+                stats.latency.merge(other_stats.latency)
+
+    @property
+    def elapsed(self) -> float:
+        return perf_counter() - self.started
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ Get the cumulative statistics so far, latencies in milliseconds. """
+        elapsed = self.elapsed
+        with self.lock:
+            methods = {}
+            for method, stats in sorted(self.methods.items()):
+                methods[method] = dict(stats.latency.summary(), calls=stats.calls, errors=stats.errors,
+                                       rate=stats.calls / elapsed if elapsed else 0.0)
+        return {"time": time(), "elapsed": elapsed, "methods": methods}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {method: {"calls": stats.calls, "errors": stats.errors, "latency": stats.latency.to_dict()}
+                    for method, stats in self.methods.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CallMetrics":
+        metrics = cls()
+        for method, item in data.items():
+            stats = metrics.methods[method] = MethodStats()
+            stats.calls = item["calls"]
+            stats.errors = item["errors"]
+            stats.latency = Histogram.from_dict(item["latency"])
+        return metrics
+
+    def report(self, logger: logging.Logger, elapsed: float = None):
+        """ Log calls/sec and latency percentiles per method. """
+        elapsed = elapsed or self.elapsed
+        labels = ' '.join(f"{label:>8}" for label, _ in PERCENTILES)
+        logger.info(f"{'method':20} {'calls':>10} {'errors':>8} {'calls/sec':>10} {labels}  (ms)")
+        with self.lock:
+            for method, stats in sorted(self.methods.items()):
+                values = ' '.join(f"{stats.latency.percentile(fraction) * 1000:8.2f}" for _, fraction in PERCENTILES)
+                logger.info(f"{method:20} {stats.calls:10,} {stats.errors:8,} {stats.calls / elapsed:10,.0f} {values}")
+
+
+class SnapshotWriter:
+    """ Background thread that appends a `CallMetrics` snapshot to a JSONL file every `interval` seconds. """
+
+    def __init__(self, metrics: CallMetrics, path: str, interval: float = 10):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="SnapshotWriter", daemon=True)
+
+    def __enter__(self) -> "SnapshotWriter":
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def write(self):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(self.metrics.snapshot()) + '\n')
@@ -0,0 +1,651 @@
+""" Local stand-in for a multichaind JSON-RPC server.
+
+It implements the subset of the MultiChain JSON-API used by the scripts in this repository, keeps all state in
+memory, mines the mempool into a new block every `block_time` seconds, and can add latency and inject errors, so
+the client stack can be measured and exercised without MultiChain binaries.
+
+Run it standalone with ``python -m creator.mock_node --chain chain1``; this writes params.dat and multichain.conf
+into the chain folder so `RpcApi` connects to it like to a real node.
+"""
+import hashlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from typing import Any, Dict, List, Optional
+
+from .chain import Chain
+
+log = logging.getLogger(__name__)
+
+BLOCKCHAIN_PARAMS = {
+    "chain-protocol": "multichain",
+    "protocol-version": 20011,
+    "max-std-tx-size": 4194304,
+    "max-std-op-returns-count": 10,
+    "max-std-op-return-size": 2097152,
+    "max-std-op-drops-count": 5,
+    "max-std-element-size": 80000,
+    "target-block-time": 15,
+}
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class MockNode:
+    """ In-memory MultiChain node answering JSON-RPC calls over HTTP on `port` (0 picks a free port).
+
+    Every call sleeps `latency` seconds (or `method_latency[method]`) and fails with probability `error_rate`.
+    """
+
+    def __init__(self, chain_name: str = "chain1", port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 block_time: float = 1.0, method_latency: Dict[str, float] = None, seed: int = None):
+        self.chain_name = chain_name
+        self.latency = latency
+        self.method_latency = method_latency or {}
+        self.error_rate = error_rate
+        self.block_time = block_time
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.mining = True
+        self.blocks: List[Dict[str, Any]] = []
+        self.mempool: List[str] = []
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.addresses: List[str] = []
+        self.permissions: Dict[str, set] = {}
+        self.entities: Dict[str, Dict[str, Any]] = {}
+        self.stream_items: Dict[str, List[Dict[str, Any]]] = {}
+        self.asset_transactions: Dict[str, List[Dict[str, Any]]] = {}
+        self.balances: Dict[str, Dict[str, float]] = {}
+        self.caches: Dict[str, bytearray] = {}
+        self.calls = 0
+        self.stopped = threading.Event()
+        self._mine_block()
+        admin = self._new_address()
+        self.permissions[admin] = {"connect", "send", "receive", "issue", "create", "mine", "admin", "activate"}
+
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    self._reply(500, {"result": None, "error": {"code": -32700, "message": "Parse error"},
+                                      "id": None})
+                    return
+                if isinstance(request, list):
+                    self._reply(200, [node.handle(item) for item in request])
+                else:
+                    reply = node.handle(request)
+                    self._reply(200 if reply["error"] is None else 500, reply)
+
+            def _reply(self, status: int, reply: Any):
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                log.debug(format % args)
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+            # the default listen backlog of 5 drops connections under the load tests' concurrency
+            request_queue_size = 1024
+
+        self.server = Server(("127.0.0.1", port), Handler)
+        self.port = self.server.server_address[1]
+        self.threads = [threading.Thread(target=self.server.serve_forever, name="MockNode", daemon=True),
+                        threading.Thread(target=self._mine_loop, name="MockNodeMiner", daemon=True)]
+
+    def __enter__(self) -> "MockNode":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        log.info(f"Mock node for chain '{self.chain_name}' listening on port {self.port}")
+
+    def stop(self):
+        self.stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def write_config(self, datadir: Path = None) -> Chain:
+        """ Write params.dat and multichain.conf for this node and return the matching `Chain`. """
+        chain = Chain(log, self.chain_name, datadir)
+        chain.path.mkdir(parents=True, exist_ok=True)
+        with open(str(chain.path / "params.dat"), "w") as f:
+            f.write(f"# Mock node parameters\nchain-name = {self.chain_name}\n"
+                    f"default-network-port = {self.port - 1}\ndefault-rpc-port = {self.port}\n")
+        with open(str(chain.path / "multichain.conf"), "w") as f:
+            f.write(f"rpcuser=multichainrpc\nrpcpassword=mock\nrpcport={self.port}\n")
+        return chain
+
+    # Request handling
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get("method")
+        params = request.get("params") or []
+        reply = {"result": None, "error": None, "id": request.get("id")}
+        delay = self.method_latency.get(method, self.latency)
+        if delay:
+            time.sleep(delay)
+        try:
+            with self.lock:
+                self.calls += 1
+                if self.error_rate and self.random.random() < self.error_rate:
+                    raise RpcError(-1, "Injected error")
+                handler = getattr(self, f"rpc_{method}", None)
+                if handler is None:
+                    raise RpcError(-32601, "Method not found")
+                try:
+                    reply["result"] = handler(*params)
+                except TypeError as e:
+                    raise RpcError(-1, f"Invalid parameters: {e}")
+        except RpcError as e:
+            reply["error"] = {"code": e.code, "message": e.message}
+        except Exception as e:
+            # like multichaind, report bad parameters as an error reply instead of dropping the connection
+            reply["error"] = {"code": -1, "message": str(e)}
+        return reply
+
+    def _mine_loop(self):
+        while not self.stopped.wait(self.block_time):
+            with self.lock:
+                if self.mining:
+                    self._mine_block()
+
+    def _mine_block(self):
+        height = len(self.blocks)
+        block_hash = hashlib.sha256(f"{self.chain_name}:{height}:{time.time()}".encode()).hexdigest()
+        block = {"hash": block_hash, "height": height, "time": int(time.time()), "tx": self.mempool}
+        for tx_id in self.mempool:
+            self.transactions[tx_id]["block"] = height
+        self.blocks.append(block)
+        self.mempool = []
+
+    def _new_address(self) -> str:
+        address = "1" + hashlib.sha256(f"{self.chain_name}:address:{len(self.addresses)}".encode()).hexdigest()[:33]
+        self.addresses.append(address)
+        return address
+
+    def _new_tx(self, content: Dict[str, Any]) -> str:
+        content = dict(content, nonce=self.random.getrandbits(64))
+        tx_hex = json.dumps(content, sort_keys=True).encode().hex()
+        tx_id = hashlib.sha256(tx_hex.encode()).hexdigest()
+        self.transactions[tx_id] = {"hex": tx_hex, "content": content, "block": None, "time": int(time.time())}
+        self.mempool.append(tx_id)
+        return tx_id
+
+    def _confirmations(self, tx_id: str) -> int:
+        block = self.transactions[tx_id]["block"]
+        return 0 if block is None else len(self.blocks) - block
+
+    def _tx(self, tx_id: str) -> Dict[str, Any]:
+        tx = self.transactions.get(tx_id)
+        if tx is None:
+            raise RpcError(-5, "No information available about transaction")
+        return tx
+
+    def _entity(self, name: str, kind: str = None) -> Dict[str, Any]:
+        entity = self.entities.get(name)
+        if entity is None or (kind and entity["type"] != kind):
+            raise RpcError(-708 if kind == "stream" else -705, f"Entity with this name not found: {name}")
+        return entity
+
+    def _check_permission(self, address: str, permission: str):
+        if permission not in self.permissions.get(address, ()):
+            raise RpcError(-704, f"Address {address} doesn't have {permission} permission")
+
+    @property
+    def admin(self) -> str:
+        return self.addresses[0]
+
+    # Node and wallet
+
+    def rpc_getinfo(self):
+        return {"version": "mock", "chainname": self.chain_name, "protocol": "multichain", "port": self.port - 1,
+                "blocks": len(self.blocks) - 1, "connections": 0, "nodeaddress": f"{self.chain_name}@127.0.0.1"}
+
+    def rpc_getblockchainparams(self, display_names=True, with_upgrades=True):
+        return dict(BLOCKCHAIN_PARAMS, **{"chain-name": self.chain_name})
+
+    def rpc_getblockcount(self):
+        return len(self.blocks) - 1
+
+    def rpc_getblockhash(self, height: int):
+        if not 0 <= height < len(self.blocks):
+            raise RpcError(-8, "Block height out of range")
+        return self.blocks[height]["hash"]
+
+    def rpc_getblock(self, hash_or_height, verbose=1):
+        for block in self.blocks:
+            if block["hash"] == hash_or_height or block["height"] == hash_or_height:
+                return dict(block, confirmations=len(self.blocks) - block["height"])
+        raise RpcError(-5, "Block not found")
+
+    def rpc_stop(self):
+        threading.Thread(target=self.stop, daemon=True).start()
+        return "MultiChain server stopping"
+
+    def rpc_pause(self, tasks="incoming,mining"):
+        if "mining" in tasks:
+            self.mining = False
+        return None
+
+    def rpc_resume(self, tasks="incoming,mining"):
+        if "mining" in tasks:
+            self.mining = True
+        return None
+
+    def rpc_getnewaddress(self):
+        address = self._new_address()
+        return address
+
+    def rpc_listaddresses(self, addresses="*", verbose=False, count=None, start=None):
+        return [{"address": address, "ismine": True} for address in self.addresses]
+
+    def rpc_getaddresses(self, verbose=False):
+        return list(self.addresses)
+
+    def rpc_createkeypairs(self, count=1):
+        pairs = []
+        for _ in range(count):
+            address = "1" + hashlib.sha256(str(self.random.getrandbits(128)).encode()).hexdigest()[:33]
+            pairs.append({"address": address, "pubkey": "02" + hashlib.sha256(address.encode()).hexdigest(),
+                          "privkey": "V" + hashlib.sha256(address.encode() + b"priv").hexdigest()[:50]})
+        return pairs
+
+    def rpc_importaddress(self, addresses, label="", rescan=True):
+        for address in addresses if isinstance(addresses, list) else addresses.split(','):
+            if address not in self.addresses:
+                self.addresses.append(address)
+        return None
+
+    def rpc_validateaddress(self, address):
+        return {"isvalid": True, "address": address, "ismine": address in self.addresses}
+
+    # Permissions
+
+    def rpc_grant(self, addresses, permissions, native_amount=0, start_block=0, end_block=4294967295,
+                  comment=None):
+        return self.rpc_grantfrom(self.admin, addresses, permissions)
+
+    def rpc_grantfrom(self, from_address, addresses, permissions, *args):
+        address_list = addresses.split(',')
+        for address in address_list:
+            self.permissions.setdefault(address, set()).update(permissions.split(','))
+        return self._new_tx({"type": "grant", "from": from_address, "addresses": address_list,
+                             "permissions": permissions})
+
+    def rpc_revoke(self, addresses, permissions, *args):
+        for address in addresses.split(','):
+            self.permissions.setdefault(address, set()).difference_update(permissions.split(','))
+        return self._new_tx({"type": "revoke", "addresses": addresses, "permissions": permissions})
+
+    def rpc_listpermissions(self, permissions="*", addresses="*", verbose=False):
+        wanted = None if permissions == "*" else set(permissions.split(','))
+        address_list = None if addresses == "*" else set(addresses.split(','))
+        result = []
+        for address, granted in self.permissions.items():
+            if address_list is not None and address not in address_list:
+                continue
+            for permission in sorted(granted):
+                if wanted is None or permission in wanted:
+                    result.append({"address": address, "for": None, "type": permission,
+                                   "startblock": 0, "endblock": 4294967295})
+        return result
+
+    # Entities
+
+    def rpc_create(self, kind, name, open_or_params=False, custom=None, *args):
+        return self.rpc_createfrom(self.admin, kind, name, open_or_params, custom, *args)
+
+    def rpc_createfrom(self, from_address, kind, name, open_or_params=False, custom=None, *args):
+        if name in self.entities:
+            raise RpcError(-705, f"Stream, Asset, Filter or Upgrade with this name already exists: {name}")
+        tx_id = self._new_tx({"type": "create", "kind": kind, "name": name, "params": open_or_params,
+                              "custom": custom})
+        entity = {"type": kind, "name": name, "createtxid": tx_id, "params": open_or_params, "approved": False}
+        if kind in ("txfilter", "streamfilter"):
+            entity["code"] = custom
+        self.entities[name] = entity
+        if kind == "stream":
+            self.stream_items[name] = []
+        return tx_id
+
+    def rpc_approvefrom(self, from_address, name, approve):
+        entity = self._entity(name)
+        entity["approved"] = approve if isinstance(approve, bool) else bool(approve.get("approve"))
+        return self._new_tx({"type": "approve", "from": from_address, "name": name, "approve": approve})
+
+    def _list_entities(self, kind: str, names="*", verbose=False):
+        wanted = None if names == "*" else set(names if isinstance(names, list) else names.split(','))
+        return [{"name": entity["name"], "createtxid": entity["createtxid"], "approved": entity["approved"]}
+                for entity in self.entities.values()
+                if entity["type"] == kind and (wanted is None or entity["name"] in wanted)]
+
+    def rpc_liststreams(self, names="*", verbose=False, count=None, start=None):
+        if names != "*":
+            for name in names if isinstance(names, list) else names.split(','):
+                self._entity(name, "stream")
+        streams = self._list_entities("stream", names)
+        for stream in streams:
+            stream["items"] = len(self.stream_items[stream["name"]])
+            stream["keys"] = len({key for item in self.stream_items[stream["name"]] for key in item["keys"]})
+            stream["subscribed"] = True
+        return streams
+
+    def rpc_listtxfilters(self, names="*", verbose=False):
+        return self._list_entities("txfilter", names)
+
+    def rpc_liststreamfilters(self, names="*", verbose=False):
+        return self._list_entities("streamfilter", names)
+
+    def rpc_listupgrades(self, names="*"):
+        return self._list_entities("upgrade", names)
+
+    def rpc_getfiltercode(self, name):
+        entity = self._entity(name)
+        if "code" not in entity:
+            raise RpcError(-705, f"Filter with this name not found: {name}")
+        return entity["code"]
+
+    def rpc_subscribe(self, entities, rescan=True):
+        return None
+
+    # Streams
+
+    def rpc_publish(self, stream, keys, data, options=""):
+        return self.rpc_publishfrom(self.admin, stream, keys, data, options)
+
+    def rpc_publishfrom(self, from_address, stream, keys, data, options=""):
+        self._entity(stream, "stream")
+        keys = keys if isinstance(keys, list) else [keys]
+        tx_id = self._new_tx({"type": "publish", "from": from_address, "items": [
+            {"for": stream, "keys": keys, "data": data, "options": options}]})
+        self._add_item(tx_id, from_address, stream, keys, data, options)
+        return tx_id
+
+    def rpc_publishmulti(self, stream, items, options=""):
+        return self.rpc_publishmultifrom(self.admin, stream, items, options)
+
+    def rpc_publishmultifrom(self, from_address, stream, items, options=""):
+        items = [dict(item, **{"for": item.get("for", stream)}) for item in items]
+        for item in items:
+            self._entity(item["for"], "stream")
+        tx_id = self._new_tx({"type": "publish", "from": from_address, "items": items})
+        for item in items:
+            keys = item.get("keys") or [item.get("key")]
+            self._add_item(tx_id, from_address, item["for"], keys, item.get("data"), item.get("options", options))
+        return tx_id
+
+    def _add_item(self, tx_id: str, from_address: str, stream: str, keys: List[str], data: Any, options: str):
+        if isinstance(data, dict) and "cache" in data:
+            cache = self.caches.get(data["cache"])
+            if cache is None:
+                raise RpcError(-710, "Binary cache item with this identifier not found")
+            data = bytes(cache).hex()
+        self.stream_items[stream].append({"publishers": [from_address], "keys": keys,
+                                          "offchain": "offchain" in (options or ""), "available": True,
+                                          "data": data, "txid": tx_id, "vout": 0})
+
+    def _item_view(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        tx = self.transactions[item["txid"]]
+        view = dict(item, confirmations=self._confirmations(item["txid"]), time=tx["time"])
+        if tx["block"] is not None:
+            block = self.blocks[tx["block"]]
+            view.update(blocktime=block["time"], blockhash=block["hash"])
+        return view
+
+    @staticmethod
+    def _page(items: List[Any], count=None, start=None) -> List[Any]:
+        """ Apply MultiChain paging: by default the last 10 items; a negative start counts from the end. """
+        count = 10 if count is None else count
+        start = -count if start is None else start
+        if start < 0:
+            start = max(0, len(items) + start)
+        return items[start:start + count]
+
+    def rpc_liststreamitems(self, stream, verbose=False, count=None, start=None, local_ordering=False):
+        self._entity(stream, "stream")
+        return [self._item_view(item) for item in self._page(self.stream_items[stream], count, start)]
+
+    def rpc_liststreamkeyitems(self, stream, key, verbose=False, count=None, start=None, local_ordering=False):
+        self._entity(stream, "stream")
+        items = [item for item in self.stream_items[stream] if key in item["keys"]]
+        return [self._item_view(item) for item in self._page(items, count, start)]
+
+    def rpc_liststreamkeys(self, stream, keys="*", verbose=False, count=None, start=None, local_ordering=False):
+        self._entity(stream, "stream")
+        counts: Dict[str, int] = {}
+        for item in self.stream_items[stream]:
+            for key in item["keys"]:
+                counts[key] = counts.get(key, 0) + 1
+        return [{"key": key, "items": items} for key, items in self._page(list(counts.items()), count, start)]
+
+    # Binary cache
+
+    def rpc_createbinarycache(self):
+        ident = hashlib.sha256(str(self.random.getrandbits(128)).encode()).hexdigest()[:32]
+        self.caches[ident] = bytearray()
+        return ident
+
+    def rpc_appendbinarycache(self, ident, data_hex):
+        cache = self.caches.get(ident)
+        if cache is None:
+            raise RpcError(-710, "Binary cache item with this identifier not found")
+        try:
+            cache.extend(bytes.fromhex(data_hex))
+        except ValueError:
+            raise RpcError(-8, "data should be hexadecimal string")
+        return len(cache)
+
+    def rpc_deletebinarycache(self, ident):
+        if self.caches.pop(ident, None) is None:
+            raise RpcError(-710, "Binary cache item with this identifier not found")
+        return None
+
+    # Transactions
+
+    def _decode(self, tx_id: str) -> Dict[str, Any]:
+        tx = self.transactions[tx_id]
+        content = tx["content"]
+        decoded = {"txid": tx_id, "hex": tx["hex"], "version": 1, "locktime": 0, "vin": [{"txid": "0" * 64}],
+                   "vout": [{"n": 0, "value": 0}], "data": [], "time": tx["time"],
+                   "confirmations": self._confirmations(tx_id)}
+        if content.get("type") == "publish":
+            decoded["vout"] += [{"n": i + 1, "value": 0, "items": [item]} for i, item in enumerate(content["items"])]
+            decoded["data"] = [item["data"] for item in content["items"]]
+        if tx["block"] is not None:
+            block = self.blocks[tx["block"]]
+            decoded.update(blockhash=block["hash"], blocktime=block["time"])
+        return decoded
+
+    def rpc_getrawtransaction(self, tx_id, verbose=0):
+        tx = self._tx(tx_id)
+        return self._decode(tx_id) if verbose else tx["hex"]
+
+    def rpc_gettransaction(self, tx_id, include_watch_only=False):
+        self._tx(tx_id)
+        return self._decode(tx_id)
+
+    def rpc_decoderawtransaction(self, tx_hex):
+        for tx_id, tx in self.transactions.items():
+            if tx["hex"] == tx_hex:
+                return self._decode(tx_id)
+        try:
+            content = json.loads(bytes.fromhex(tx_hex))
+        except ValueError:
+            raise RpcError(-22, "TX decode failed")
+        return {"txid": hashlib.sha256(tx_hex.encode()).hexdigest(), "hex": tx_hex, "vin": [], "vout": [],
+                "data": [item.get("data") for item in content.get("items", [])]}
+
+    # Filters
+
+    def _evaluate_filter(self, script: str, tx_hex: str) -> Dict[str, Any]:
+        """ Pretend to run `script`: an endless loop times out, code without a filter function fails to compile. """
+        start = time.perf_counter()
+        if tx_hex not in {tx["hex"] for tx in self.transactions.values()}:
+            self.rpc_decoderawtransaction(tx_hex)
+        if "filtertransaction" not in script and "filterstreamitem" not in script:
+            return {"compiled": False, "passed": False, "reason": "Couldn't find filter function", "time": 0.0}
+        if "while (true)" in script or "while(true)" in script:
+            return {"compiled": True, "passed": False, "reason": "Filter aborted due to timeout after 1000 ms",
+                    "time": 1.0}
+        return {"compiled": True, "passed": True, "reason": None, "time": time.perf_counter() - start}
+
+    def rpc_testtxfilter(self, restrictions, script, tx_hex=None):
+        return self._evaluate_filter(script, tx_hex) if tx_hex else {"compiled": True, "passed": True}
+
+    def rpc_runtxfilter(self, name, tx_hex=None):
+        entity = self._entity(name)
+        return self._evaluate_filter(entity.get("code") or "", tx_hex) if tx_hex else {"compiled": True}
+
+    # Assets
+
+    def rpc_issue(self, address, asset, quantity, units=1, native_amount=0, custom=None):
+        return self.rpc_issuefrom(self.admin, address, asset, quantity, units, native_amount, custom)
+
+    def rpc_issuefrom(self, from_address, address, asset, quantity, units=1, native_amount=0, custom=None):
+        params = asset if isinstance(asset, dict) else {"name": asset}
+        name = params["name"]
+        if name in self.entities:
+            raise RpcError(-705, f"Asset with this name already exists: {name}")
+        tx_id = self._new_tx({"type": "issue", "to": address, "asset": params, "quantity": quantity})
+        self.entities[name] = {"type": "asset", "name": name, "createtxid": tx_id, "params": params,
+                               "approved": True, "units": units, "quantity": quantity}
+        self.asset_transactions[name] = []
+        self._transfer(tx_id, None, address, {name: quantity})
+        return tx_id
+
+    def rpc_issuemore(self, address, asset, quantity, native_amount=0, custom=None):
+        self._entity(asset, "asset")["quantity"] += quantity
+        tx_id = self._new_tx({"type": "issuemore", "to": address, "asset": asset, "quantity": quantity})
+        self._transfer(tx_id, None, address, {asset: quantity})
+        return tx_id
+
+    def _transfer(self, tx_id: str, from_address: Optional[str], to_address: str, amounts: Dict[str, Any]):
+        for asset, quantity in amounts.items():
+            if asset == "data" or not isinstance(quantity, (int, float)):
+                continue
+            if asset == "":
+                continue
+            self._entity(asset, "asset")
+            if from_address is not None:
+                balance = self.balances.setdefault(from_address, {}).get(asset, 0)
+                if balance < quantity:
+                    raise RpcError(-6, "Insufficient funds")
+                self.balances[from_address][asset] = balance - quantity
+            to_balances = self.balances.setdefault(to_address, {})
+            to_balances[asset] = to_balances.get(asset, 0) + quantity
+            self.asset_transactions[asset].append({"txid": tx_id, "from": from_address, "to": to_address,
+                                                   "qty": quantity})
+
+    def rpc_sendfrom(self, from_address, to_address, amounts, *args):
+        self._check_permission(from_address, "send")
+        tx_id = self._new_tx({"type": "send", "from": from_address, "to": to_address, "amounts": amounts})
+        self._transfer(tx_id, from_address, to_address, amounts if isinstance(amounts, dict) else {})
+        return tx_id
+
+    def rpc_sendwithdatafrom(self, from_address, to_address, amounts, data):
+        self._check_permission(from_address, "send")
+        tx_id = self._new_tx({"type": "send", "from": from_address, "to": to_address, "amounts": amounts,
+                              "data": data})
+        self._transfer(tx_id, from_address, to_address, amounts if isinstance(amounts, dict) else {})
+        return tx_id
+
+    # Raw transactions
+
+    def rpc_createrawsendfrom(self, from_address, amounts, data=None, action=""):
+        items = [item for item in data or [] if isinstance(item, dict) and "for" in item]
+        if len(data or []) > BLOCKCHAIN_PARAMS["max-std-op-returns-count"]:
+            raise RpcError(-26, "64: scriptpubkey")
+        for item in items:
+            self._entity(item["for"], "stream")
+        content = {"type": "raw", "from": from_address, "amounts": amounts, "items": items}
+        if "send" in action:
+            return self._send_raw(content)
+        tx_hex = json.dumps(content, sort_keys=True).encode().hex()
+        return {"hex": tx_hex, "complete": True} if "sign" in action else tx_hex
+
+    def rpc_signrawtransaction(self, tx_hex, *args):
+        return {"hex": tx_hex, "complete": True}
+
+    def rpc_sendrawtransaction(self, tx_hex):
+        try:
+            content = json.loads(bytes.fromhex(tx_hex))
+        except ValueError:
+            raise RpcError(-22, "TX decode failed")
+        return self._send_raw(content)
+
+    def _send_raw(self, content: Dict[str, Any]) -> str:
+        from_address = content["from"]
+        if content["amounts"]:
+            self._check_permission(from_address, "send")
+        tx_id = self._new_tx({"type": "publish", "from": from_address, "items": content["items"],
+                              "amounts": content["amounts"]})
+        for to_address, amounts in content["amounts"].items():
+            self._transfer(tx_id, from_address, to_address, amounts if isinstance(amounts, dict) else {})
+        for item in content["items"]:
+            keys = item.get("keys") or [item.get("key")]
+            self._add_item(tx_id, from_address, item["for"], keys, item.get("data"), item.get("options", ""))
+        return tx_id
+
+    def rpc_getaddressbalances(self, address, minconf=1, include_locked=False):
+        return [{"name": asset, "qty": qty} for asset, qty in self.balances.get(address, {}).items()]
+
+    def rpc_listassettransactions(self, asset, verbose=False, count=None, start=None, local_ordering=False):
+        self._entity(asset, "asset")
+        return [dict(item, confirmations=self._confirmations(item["txid"]))
+                for item in self._page(self.asset_transactions[asset], count, start)]
+
+
+def main():
+    parser = ArgumentParser(description="Serve a mock MultiChain JSON-RPC node", parents=[Chain.options_parser()])
+    parser.add_argument("-p", "--port", type=int, default=0, help="RPC port (default: a free port)")
+    parser.add_argument("--latency", type=float, metavar="SEC", default=0.0, help="delay added to every call")
+    parser.add_argument("--error-rate", type=float, metavar="P", default=0.0,
+                        help="probability that a call fails with an injected error")
+    parser.add_argument("--block-time", type=float, metavar="SEC", default=1.0,
+                        help="seconds between mined blocks (default: %(default)s)")
+    options = parser.parse_args()
+
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if options.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)-7s %(message)s")
+    node = MockNode(options.chain, options.port, options.latency, options.error_rate, options.block_time)
+    chain = node.write_config(Path(options.datadir) if options.datadir else None)
+    log.info(f"Wrote configuration to {chain.path}")
+    with node:
+        try:
+            node.stopped.wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
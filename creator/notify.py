@@ -0,0 +1,54 @@
+import logging
+import socket
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+SEND_SCRIPT = "import socket,sys; " \
+              "socket.socket(socket.AF_INET, socket.SOCK_DGRAM).sendto(sys.argv[1].encode(), ('127.0.0.1', {PORT}))"
+
+
+class BlockNotifyListener:
+    """ Wake waiters when multichaind reports a new block or wallet transaction.
+
+    The daemon must be started with `daemon_args`, which make its -blocknotify and -walletnotify hooks send the
+    block hash or txid as a UDP datagram to a local socket owned by this listener.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.event = threading.Event()
+        self.notifications = 0
+        self.thread = threading.Thread(target=self._run, name="BlockNotifyListener", daemon=True)
+        self.thread.start()
+
+    @property
+    def command(self) -> str:
+        """ Shell command for the daemon to run on every notification, with %s for the hash or txid. """
+        return f'"{sys.executable}" -c "{SEND_SCRIPT.format(PORT=self.port)}" %s'
+
+    @property
+    def daemon_args(self):
+        return [f"-blocknotify={self.command}", f"-walletnotify={self.command}"]
+
+    def _run(self):
+        while True:
+            try:
+                data = self.sock.recv(256)
+            except OSError:
+                return
+            self.notifications += 1
+            log.debug(f"notification: {data.decode(errors='replace')}")
+            self.event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """ Wait up to `timeout` seconds for a notification. Return True if one arrived. """
+        notified = self.event.wait(timeout)
+        self.event.clear()
+        return notified
+
+    def close(self):
+        self.sock.close()
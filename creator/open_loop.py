@@ -0,0 +1,132 @@
+""" Open-loop load: issue calls on a fixed schedule, whether or not earlier calls have completed.
+
+A closed loop that waits for each call before sending the next slows down with the node, so it never offers
+more load than the node absorbs and leaves out the calls it would have sent during a stall. Here every call has
+an intended send time from a `RateSchedule`, and its latency is measured from that time: a call that waits
+behind a stalled connection, or is dispatched late because the client fell behind, is charged the wait.
+"""
+import asyncio
+import logging
+import math
+import re
+from argparse import ArgumentTypeError
+from time import perf_counter
+from typing import Any, Callable, Iterator, NamedTuple, Sequence
+
+import aiohttp
+
+from .async_rpc_api import AsyncRpcApi
+from .metrics import Histogram
+
+RATE_UNITS = {"s": 1, "sec": 1, "m": 60, "min": 60}
+RATE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)(?:/(\w+))?$")
+
+
+def parse_rate(text: str) -> float:
+    """ Parse a call rate such as ``2000``, ``2000/s`` or ``600/min`` into calls per second. """
+    match = RATE_PATTERN.match(text.strip())
+    if match is None or (match.group(2) or "s") not in RATE_UNITS or float(match.group(1)) <= 0:
+        raise ArgumentTypeError(f"invalid rate '{text}', expected e.g. 2000/s or 600/min")
+    return float(match.group(1)) / RATE_UNITS[match.group(2) or "s"]
+
+
+class RateSchedule(NamedTuple):
+    """ `rate` calls per second for `duration` seconds, the rate first rising linearly from 0 over `ramp_up`. """
+    rate: float
+    duration: float
+    ramp_up: float = 0.0
+
+    def offset(self, index: int) -> float:
+        """ Get the intended send time of call `index`, in seconds from the start. """
+        ramp_calls = self.rate * self.ramp_up / 2
+        if index < ramp_calls:
+            return math.sqrt(2 * self.ramp_up * index / self.rate)
+        return self.ramp_up + (index - ramp_calls) / self.rate
+
+    def offsets(self) -> Iterator[float]:
+        index = 0
+        while True:
+            offset = self.offset(index)
+            if offset >= self.duration:
+                return
+            yield offset
+            index += 1
+
+
+class OpenLoopLoad:
+    """ Send the calls made by `make_call(index)` through `api` at the times of `schedule`. """
+
+    def __init__(self, logger: logging.Logger, api: AsyncRpcApi, schedule: RateSchedule):
+        self.logger = logger
+        self.api = api
+        self.schedule = schedule
+        self.latency = Histogram()
+        self.dispatch_latency = Histogram()
+        self.max_lag = 0.0
+        self.sent = 0
+        self.errors = 0
+        self.failed_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.steady_sent = 0
+        self.steady_completed = 0
+        self.start = 0.0
+
+    async def call(self, intended: float, call: Sequence[Any]):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        dispatched = perf_counter()
+        failed = True
+        try:
+            result = await self.api.command(*call, is_log=False)
+            failed = isinstance(result, dict) and result.get("error") is not None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # timeouts and dropped connections are expected when the offered load overwhelms the node
+            self.logger.debug(f"{call[0]} failed: {e!r}")
+            self.failed_calls += 1
+        finally:
+            self.in_flight -= 1
+        done = perf_counter()
+        self.latency.record(done - intended)
+        self.dispatch_latency.record(done - dispatched)
+        if failed:
+            self.errors += 1
+        elif self.schedule.ramp_up <= done - self.start <= self.schedule.duration:
+            self.steady_completed += 1
+
+    async def run(self, make_call: Callable[[int], Sequence[Any]]) -> float:
+        """ Run the schedule, wait for the calls still in flight, and return the elapsed time. """
+        tasks = []
+        self.start = perf_counter()
+        for index, offset in enumerate(self.schedule.offsets()):
+            intended = self.start + offset
+            delay = intended - perf_counter()
+            self.max_lag = max(self.max_lag, -delay)
+            # sleep(0) still lets the calls already started proceed when the schedule is behind
+            await asyncio.sleep(max(delay, 0.0))
+            tasks.append(asyncio.ensure_future(self.call(intended, make_call(index))))
+            self.sent += 1
+            if offset >= self.schedule.ramp_up:
+                self.steady_sent += 1
+        send_time = perf_counter() - self.start
+        await asyncio.gather(*tasks)
+        elapsed = perf_counter() - self.start
+        self.report(send_time, elapsed)
+        return elapsed
+
+    def report(self, send_time: float, elapsed: float):
+        schedule = self.schedule
+        ramp = f" after {schedule.ramp_up:g} sec ramp-up" if schedule.ramp_up else ""
+        self.logger.info(f"Target {schedule.rate:,.0f} calls/sec{ramp} for {schedule.duration:g} sec:"
+                         f" sent {self.sent:,} calls ({self.errors:,} failed, {self.failed_calls:,} of them without"
+                         f" a reply), all done after {elapsed:.2f} sec")
+        steady = schedule.duration - schedule.ramp_up
+        if steady > 0:
+            send_rate = self.steady_sent / max(send_time - schedule.ramp_up, steady)
+            self.logger.info(f"At constant rate: sent {send_rate:,.0f} calls/sec and completed"
+                             f" {self.steady_completed / steady:,.0f} successfully, target {schedule.rate:,.0f}")
+        self.logger.info(f"Send lag up to {self.max_lag * 1000:.1f} ms, up to {self.max_in_flight:,} calls in flight")
+        for label, histogram in (("from intended send time", self.latency),
+                                 ("from dispatch, including the wait for a connection", self.dispatch_latency)):
+            values = ', '.join(f"{key} {value:.1f}" for key, value in histogram.summary().items() if key != "count")
+            self.logger.info(f"Latency {label} (ms): {values}")
@@ -0,0 +1,85 @@
+import os
+import random
+import string
+from typing import Dict, Optional
+
+ALPHABETS = {
+    "hexdigits": string.hexdigits,
+    "letters": string.ascii_letters,
+    "printable": string.printable,
+}
+
+
+class PayloadPool:
+    """ Random payload generator for load tests.
+
+    Random data is produced in blocks of `block_size` characters per kind, and every request is served as a
+    slice of the current block, so the per-payload cost is a slice instead of a per-character loop.
+    Kinds are "hex" (lowercase hexadecimal) and the keys of `ALPHABETS`.
+
+    Blocks come from `os.urandom`, or from a `random.Random` seeded with `seed` for reproducible runs.
+    The pool is not thread safe; give every thread or process its own.
+    """
+
+    def __init__(self, block_size: int = 1 << 20, seed: Optional[int] = None):
+        self.block_size = block_size
+        self.rng: Optional[random.Random] = None
+        self.blocks: Dict[str, bytes] = {}
+        self.positions: Dict[str, int] = {}
+        self.tables: Dict[str, tuple] = {}
+        for kind, alphabet in ALPHABETS.items():
+            # Map random bytes to alphabet characters; bytes above the largest multiple of the alphabet size are
+            # deleted so every character is equally likely.
+            limit = 256 - 256 % len(alphabet)
+            table = bytes(ord(alphabet[b % len(alphabet)]) if b < limit else 0 for b in range(256))
+            self.tables[kind] = (table, bytes(range(limit, 256)), limit)
+        self.reseed(seed)
+
+    def reseed(self, seed: Optional[int]):
+        """ Restart the pool, from `os.urandom` if `seed` is None, otherwise reproducibly from `seed`. """
+        self.rng = random.Random(seed) if seed is not None else None
+        self.blocks.clear()
+        self.positions.clear()
+
+    def random_bytes(self, size: int) -> bytes:
+        if self.rng is None:
+            return os.urandom(size)
+        return self.rng.getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+    def _generate(self, kind: str, size: int) -> bytes:
+        if kind == "hex":
+            return self.random_bytes((size + 1) // 2).hex()[:size].encode("ascii")
+        table, deleted, limit = self.tables[kind]
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = self.random_bytes(remaining * 256 // limit + 16).translate(table, deleted)[:remaining]
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def view(self, kind: str, size: int) -> memoryview:
+        """ Get `size` random ASCII characters of `kind` as a read-only view into the current block. """
+        if size > self.block_size:
+            return memoryview(self._generate(kind, size))
+        position = self.positions.get(kind, self.block_size)
+        if position + size > self.block_size:
+            self.blocks[kind] = self._generate(kind, self.block_size)
+            position = 0
+        self.positions[kind] = position + size
+        return memoryview(self.blocks[kind])[position:position + size]
+
+    def string(self, kind: str, size: int) -> str:
+        return str(self.view(kind, size), "ascii")
+
+    def hex_data(self, length: int = 50) -> str:
+        """ Random string with `length` hexadecimal characters. """
+        return self.string("hex", length)
+
+    def text_data(self, length: int = 50) -> object:
+        """ Random multichain text data with a message of `length` letters. """
+        return {"text": self.string("letters", length)}
+
+    def json_data(self, length: int = 50) -> object:
+        """ Random multichain JSON data with a message of `length` letters. """
+        return {"json": {"list": [1, 2, 3], "message": self.string("letters", length)}}
@@ -1,33 +1,68 @@
 import logging
 import pprint
-from time import sleep
-from typing import Dict
-
-from Savoir import Savoir
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
 
 from .chain import Chain
+from .keystore import KeyPair, load_keystore, save_keystore
+from .metrics import CallMetrics
+from .notify import BlockNotifyListener
+from .trace import TraceRecorder
+from .transport import RpcTransport, Timeout
+
+
+class RpcError(Exception):
+    """ A JSON-API command returned an error. """
+
+    def __init__(self, cmd: str, error: Dict[str, Any]):
+        super().__init__(f"{cmd} failed: {error.get('message')} (code {error.get('code')})")
+        self.cmd = cmd
+        self.error = error
+
+
+class BatchResult(NamedTuple):
+    """ Outcome of one call in a JSON-RPC batch: either `result` or `error` is set. """
+    result: Any
+    error: Optional[Dict[str, Any]]
 
 
 class RpcApi:
-    def __init__(self, logger: logging.Logger, chain_name: str, verbose=False):
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_PAGE_SIZE = 1000
+    DEFAULT_CHUNK_SIZE = 1 << 20
+    DEFAULT_TX_CACHE_SIZE = 1000
+    DEFAULT_ADDRESS_BATCH_SIZE = 500
+    POLL_DELAY = 0.05
+    MAX_POLL_DELAY = 1.0
+
+    def __init__(self, logger: logging.Logger, chain_name: str, verbose=False, pool_size: int = 10,
+                 timeout: Timeout = (3.05, 60), retries: int = 2, metrics: CallMetrics = None,
+                 notifier: BlockNotifyListener = None, datadir: Path = None,
+                 tx_cache_size: int = DEFAULT_TX_CACHE_SIZE, recorder: TraceRecorder = None):
         self.logger = logger
-        self.chain = Chain(self.logger, chain_name)
+        self.metrics = metrics
+        self.recorder = recorder
+        self.notifier = notifier
+        self.tx_cache: OrderedDict = OrderedDict()
+        self.tx_cache_size = tx_cache_size
+        self.tx_cache_hits = 0
+        self.tx_cache_misses = 0
+        self.tx_cache_lock = threading.Lock()
+        self.chain = Chain(self.logger, chain_name, datadir)
         self.config = self.load_config("multichain.conf")
         self.params = self.load_config("params.dat")
-        self.api = Savoir(self.config["rpcuser"], self.config["rpcpassword"], "localhost",
-                          self.params["default-rpc-port"], self.chain.name)
-        logging.getLogger("Savoir").setLevel(logging.INFO if verbose else logging.WARNING)
+        self.rpc_port = int(self.config.get("rpcport", self.params["default-rpc-port"]))
+        self.transport = RpcTransport(f"http://localhost:{self.rpc_port}",
+                                      (self.config["rpcuser"], self.config["rpcpassword"]), self.chain.name,
+                                      pool_size=pool_size, timeout=timeout, retries=retries)
+        logging.getLogger("creator.transport").setLevel(logging.INFO if verbose else logging.WARNING)
 
     def load_config(self, config_name: str) -> Dict[str, str]:
-        self.logger.debug(f"load_config(config_name={config_name!r})")
-        path = self.chain.path / config_name
-        config = {}
-        with open(str(path)) as f:
-            for line in f:
-                parts = line.split('#', 1)[0].split('=', 1)
-                if len(parts) == 2:
-                    config[parts[0].strip()] = parts[1].strip()
-        return config
+        return self.chain.load_config(config_name)
 
     def adjust_config(self):
         self.logger.debug(f"adjust_config()")
@@ -37,7 +72,73 @@ class RpcApi:
             f.write(f"rpcport={port}\n")
 
     def command(self, cmd: str, *args, **kwargs):
-        return getattr(self.api, cmd)(*args, **kwargs)
+        if self.metrics is None and self.recorder is None:
+            return self.transport.call(cmd, *args, **kwargs)
+        start = perf_counter()
+        result = self.transport.call(cmd, *args, **kwargs)
+        latency = perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.record(cmd, latency, isinstance(result, dict) and result.get("error") is not None)
+        if self.recorder is not None:
+            self.recorder.record(cmd, list(args), latency, result)
+        return result
+
+    def checked_command(self, cmd: str, *args, **kwargs):
+        """ Like `command`, but raise `RpcError` instead of returning an error response. """
+        result = self.command(cmd, *args, **kwargs)
+        if isinstance(result, dict) and result.get("error") is not None:
+            raise RpcError(cmd, result["error"])
+        return result
+
+    def command_batch(self, calls: Iterable[Sequence], batch_size: int = DEFAULT_BATCH_SIZE) -> List[BatchResult]:
+        """ Issue many JSON-API commands using JSON-RPC 2.0 batch requests.
+
+        Every item of `calls` is a sequence ``(cmd, arg1, arg2, ...)``. The calls are sent in HTTP requests of at
+        most `batch_size` calls each. The result list has one `BatchResult` per call, in the order of `calls`.
+        """
+        results = []
+        batch = []
+        for call in calls:
+            batch.append(call)
+            if len(batch) >= batch_size:
+                results.extend(self._send_batch(batch))
+                batch = []
+        if batch:
+            results.extend(self._send_batch(batch))
+        return results
+
+    def _send_batch(self, batch: List[Sequence]) -> List[BatchResult]:
+        self.logger.debug(f"_send_batch(calls={len(batch)})")
+        payload = [{"jsonrpc": "2.0", "id": i, "method": call[0], "params": list(call[1:]),
+                    "chain_name": self.chain.name}
+                   for i, call in enumerate(batch)]
+        start = perf_counter()
+        response = self.transport.post(payload, is_log=False)
+        # Every call in the batch is charged the latency of the whole round trip
+        latency = perf_counter() - start
+        if self.metrics is not None:
+            errors = {reply.get("id") for reply in response if reply.get("error") is not None} \
+                if isinstance(response, list) else set(range(len(batch)))
+            for i, call in enumerate(batch):
+                self.metrics.record(call[0], latency, i in errors)
+        if not isinstance(response, list):
+            # The node rejected the batch as a whole
+            error = response.get("error") or {"code": None, "message": str(response)}
+            results = [BatchResult(None, error)] * len(batch)
+        else:
+            by_id = {reply.get("id"): reply for reply in response}
+            results = []
+            for i in range(len(batch)):
+                reply = by_id.get(i)
+                if reply is None:
+                    results.append(BatchResult(None, {"code": None, "message": "No reply for call"}))
+                else:
+                    results.append(BatchResult(reply.get("result"), reply.get("error")))
+        if self.recorder is not None:
+            for call, result in zip(batch, results):
+                self.recorder.record(call[0], list(call[1:]), latency,
+                                     result.result if result.error is None else {"error": result.error})
+        return results
 
     def print_command(self, cmd: str, *args, **kwargs):
         result = self.command(cmd, *args, **kwargs)
@@ -46,19 +147,247 @@ class RpcApi:
                 self.logger.debug(line)
         return result
 
+    def iter_pages(self, cmd: str, *args, page_size: int = DEFAULT_PAGE_SIZE, start: int = 0,
+                   prefetch: bool = False) -> Iterator[List[Any]]:
+        """ Yield the results of a paged listing command page by page.
+
+        Calls ``cmd *args page_size start`` with `start` advancing by `page_size` until a short page is returned.
+        With `prefetch`, the next page is requested in a background thread while the current one is consumed.
+        """
+        def fetch(page_start: int) -> List[Any]:
+            return self.checked_command(cmd, *args, page_size, page_start, is_log=False)
+
+        if not prefetch:
+            while True:
+                page = fetch(start)
+                if page:
+                    yield page
+                if len(page) < page_size:
+                    return
+                start += page_size
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch, start)
+            while future is not None:
+                page = future.result()
+                start += page_size
+                future = executor.submit(fetch, start) if len(page) == page_size else None
+                if page:
+                    yield page
+
+    def iter_stream_items(self, stream: str, verbose: bool = False, **kwargs) -> Iterator[Dict[str, Any]]:
+        """ Lazily iterate over all items of `stream`, fetching them with `liststreamitems` in pages. """
+        for page in self.iter_pages("liststreamitems", stream, verbose, **kwargs):
+            yield from page
+
+    def iter_stream_key_items(self, stream: str, key: str, verbose: bool = False,
+                              **kwargs) -> Iterator[Dict[str, Any]]:
+        """ Lazily iterate over the items of `stream` with `key`, fetching them with `liststreamkeyitems`. """
+        for page in self.iter_pages("liststreamkeyitems", stream, key, verbose, **kwargs):
+            yield from page
+
+    def iter_asset_transactions(self, asset: str, verbose: bool = False, **kwargs) -> Iterator[Dict[str, Any]]:
+        """ Lazily iterate over the transactions of `asset`, fetching them with `listassettransactions`. """
+        for page in self.iter_pages("listassettransactions", asset, verbose, **kwargs):
+            yield from page
+
+    def print_stream_items(self, stream: str, **kwargs):
+        """ Log the items of `stream` at debug level, without fetching them when debug logging is off. """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for item in self.iter_stream_items(stream, **kwargs):
+                for line in pprint.pformat(item).split('\n'):
+                    self.logger.debug(line)
+
+    def upload_binary_cache(self, source: Union[bytes, bytearray, memoryview, Path],
+                            chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            progress: Callable[[int, int], None] = None) -> str:
+        """ Create a binary cache holding `source` (a buffer or a file) and return its identifier.
+
+        The data is sent with ``appendbinarycache`` in chunks of `chunk_size` bytes, so only one chunk at a time
+        is converted to hex. `progress` is called with the bytes sent so far and the total after every chunk.
+        """
+        total = source.stat().st_size if isinstance(source, Path) else len(source)
+        ident = self.checked_command("createbinarycache", is_log=False)
+        start = perf_counter()
+        sent = 0
+        try:
+            for chunk in self._iter_chunks(source, chunk_size):
+                self.checked_command("appendbinarycache", ident, chunk.hex(), is_log=False)
+                sent += len(chunk)
+                if progress is not None:
+                    progress(sent, total)
+                self.logger.debug(f"Cache {ident}: {sent:,} of {total:,} bytes ({sent / total:.0%})")
+        except Exception:
+            self.command("deletebinarycache", ident, is_log=False)
+            raise
+        elapsed = perf_counter() - start
+        self.logger.info(f"Uploaded {total:,} bytes to cache {ident} in {elapsed:.2f} sec"
+                         f" ({total / elapsed / (1 << 20) if elapsed else 0:,.1f} MB/sec)")
+        return ident
+
+    @staticmethod
+    def _iter_chunks(source: Union[bytes, bytearray, memoryview, Path], chunk_size: int) -> Iterator[memoryview]:
+        if not isinstance(source, Path):
+            view = memoryview(source).cast('B')
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size]
+            return
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        with open(str(source), "rb") as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    return
+                yield view[:size]
+
+    def upload_binary_caches(self, sources: Sequence[Union[bytes, bytearray, memoryview, Path]],
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 4) -> List[str]:
+        """ Upload several binary caches in parallel and return their identifiers in the order of `sources`. """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda source: self.upload_binary_cache(source, chunk_size), sources))
+
+    def provision_addresses(self, count: int, permissions: str = "send,receive", keystore: Path = None,
+                            batch_size: int = DEFAULT_ADDRESS_BATCH_SIZE) -> List[KeyPair]:
+        """ Get `count` external addresses in the wallet with `permissions`, and return their keypairs.
+
+        Keypairs saved in `keystore` for this chain are reused and new ones are created with ``createkeypairs`` and
+        added to it; a keystore of another chain, identified by its genesis block hash, is replaced. Addresses
+        missing from the wallet are imported without rescan, and addresses missing some of the permissions are
+        granted them; both take `batch_size` addresses per call.
+        """
+        start = perf_counter()
+        keypairs: List[KeyPair] = []
+        if keystore:
+            chain_id = self.checked_command("getblockhash", 0, is_log=False)
+            try:
+                keypairs = load_keystore(keystore, chain_id)[:count]
+            except ValueError as e:
+                self.logger.warning(f"{e}; creating new keypairs")
+        reused = len(keypairs)
+        while len(keypairs) < count:
+            keypairs.extend(self.checked_command("createkeypairs", min(batch_size, count - len(keypairs)),
+                                                 is_log=False))
+        if keystore and len(keypairs) > reused:
+            save_keystore(keystore, chain_id, keypairs)
+        addresses = [keypair["address"] for keypair in keypairs]
+
+        wallet = set(self.checked_command("getaddresses", is_log=False))
+        missing = [address for address in addresses if address not in wallet]
+        for offset in range(0, len(missing), batch_size):
+            self.checked_command("importaddress", missing[offset:offset + batch_size], "", False, is_log=False)
+
+        wanted = permissions.split(',')
+        granted: Dict[str, set] = {}
+        for item in self.checked_command("listpermissions", permissions, "*", is_log=False):
+            granted.setdefault(item["address"], set()).add(item["type"])
+        ungranted = [address for address in addresses if not granted.get(address, set()).issuperset(wanted)]
+        for offset in range(0, len(ungranted), batch_size):
+            self.checked_command("grant", ','.join(ungranted[offset:offset + batch_size]), permissions,
+                                 is_log=False)
+        self.logger.info(f"Provisioned {count:,} addresses ({reused:,} from keystore, {len(missing):,} imported,"
+                         f" {len(ungranted):,} granted {permissions}) in {perf_counter() - start:.2f} sec")
+        return keypairs
+
+    def get_raw_transaction(self, tx_id: str, verbose: bool = False):
+        """ Like ``getrawtransaction``, but served from an LRU cache of up to `tx_cache_size` transactions.
+
+        The hex of a transaction never changes, so it is always cached, also when taken from a decoded result.
+        Decoded transactions are cached once confirmed; their ``confirmations`` count is the one first seen.
+        """
+        key = (tx_id, bool(verbose))
+        with self.tx_cache_lock:
+            if key in self.tx_cache:
+                self.tx_cache.move_to_end(key)
+                self.tx_cache_hits += 1
+                return self.tx_cache[key]
+            self.tx_cache_misses += 1
+        tx = self.command("getrawtransaction", tx_id, 1 if verbose else 0, is_log=False)
+        self.cache_tx(tx_id, tx)
+        return tx
+
+    def cache_tx(self, tx_id: str, tx: Any):
+        """ Add a ``getrawtransaction`` result to the transaction cache, unless it is an error. """
+        if isinstance(tx, str):
+            entries = [((tx_id, False), tx)]
+        elif isinstance(tx, dict) and tx.get("error") is None and "hex" in tx:
+            entries = [((tx_id, False), tx["hex"])]
+            if tx.get("confirmations", 0) > 0:
+                entries.append(((tx_id, True), tx))
+        else:
+            return
+        with self.tx_cache_lock:
+            for key, value in entries:
+                self.tx_cache[key] = value
+                self.tx_cache.move_to_end(key)
+            while len(self.tx_cache) > self.tx_cache_size:
+                self.tx_cache.popitem(last=False)
+
+    def tx_cache_stats(self) -> Dict[str, int]:
+        with self.tx_cache_lock:
+            return {"size": len(self.tx_cache), "hits": self.tx_cache_hits, "misses": self.tx_cache_misses}
+
     def print_tx_id(self, tx_id: str):
-        if isinstance(tx_id, str):
-            self.print_command("getrawtransaction", tx_id, 1, is_log=False)
+        """ Log transaction `tx_id` decoded at debug level, without fetching it when debug logging is off. """
+        if isinstance(tx_id, str) and self.logger.isEnabledFor(logging.DEBUG):
+            tx = self.get_raw_transaction(tx_id, verbose=True)
+            if 'error' not in tx:
+                for line in pprint.pformat(tx).split('\n'):
+                    self.logger.debug(line)
 
     def print_tx(self, cmd: str, *args, **kwargs):
         tx_id = self.command(cmd, *args, **kwargs)
         self.print_tx_id(tx_id)
         return tx_id
 
-    def wait_for_mining(self):
-        current_blocks = self.api.getblockcount()
-        self.logger.info(f"Current blocks: {current_blocks}, mining:")
-        while self.api.getblockcount(is_log=False) <= current_blocks:
-            print('.', end='', flush=True)
-            sleep(1)
-        print()
+    def wait_until(self, condition: Callable[[], Any], timeout: float = None) -> Any:
+        """ Poll `condition` until it returns a true value, and return that value.
+
+        Polling starts every `POLL_DELAY` seconds and backs off to `MAX_POLL_DELAY`. With a `notifier`, a block
+        or wallet notification from the daemon triggers the next poll right away.
+        Raise `TimeoutError` if `timeout` seconds pass first.
+        """
+        start = perf_counter()
+        delay = self.POLL_DELAY
+        while True:
+            value = condition()
+            if value:
+                return value
+            elapsed = perf_counter() - start
+            if timeout is not None and elapsed >= timeout:
+                raise TimeoutError(f"Condition not met after {elapsed:.1f} sec")
+            if timeout is not None:
+                delay = min(delay, timeout - elapsed)
+            if self.notifier is not None:
+                self.notifier.wait(delay)
+            else:
+                sleep(delay)
+            delay = min(delay * 2, self.MAX_POLL_DELAY)
+
+    def wait_for_height(self, height: int, timeout: float = None) -> int:
+        """ Wait until the chain has at least `height` blocks and return the block count. """
+        def reached():
+            blocks = self.command("getblockcount", is_log=False)
+            return blocks if isinstance(blocks, int) and blocks >= height else None
+        return self.wait_until(reached, timeout)
+
+    def wait_for_tx(self, tx_id: str, confirmations: int = 1, timeout: float = None) -> Dict[str, Any]:
+        """ Wait until transaction `tx_id` has `confirmations` confirmations and return it decoded. """
+        def confirmed():
+            tx = self.command("getrawtransaction", tx_id, 1, is_log=False)
+            if isinstance(tx, dict) and tx.get("error") is None and tx.get("confirmations", 0) >= confirmations:
+                self.cache_tx(tx_id, tx)
+                return tx
+            return None
+        start = perf_counter()
+        tx = self.wait_until(confirmed, timeout)
+        self.logger.debug(f"{tx_id} confirmed after {perf_counter() - start:.2f} sec")
+        return tx
+
+    def wait_for_mining(self, timeout: float = None):
+        """ Wait for the next block. """
+        current_blocks = self.command("getblockcount")
+        self.logger.info(f"Current blocks: {current_blocks}, mining")
+        start = perf_counter()
+        blocks = self.wait_for_height(current_blocks + 1, timeout)
+        self.logger.info(f"Block {blocks} mined after {perf_counter() - start:.2f} sec")
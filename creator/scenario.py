@@ -0,0 +1,228 @@
+""" Declarative chain scenarios and a dependency-aware parallel executor.
+
+A scenario is a JSON (or, with PyYAML installed, YAML) document::
+
+    {
+        "addresses": {"alice": {"permissions": "send,receive"}},
+        "streams": {"stream1": {"open": true, "items": [{"key": "key1", "data": {"text": "hello"}}]}},
+        "assets": {"asset1": {"quantity": 1000, "units": 0.1, "open": true,
+                              "transfers": [{"to": "alice", "quantity": 10}]}},
+        "permissions": [{"address": "alice", "permissions": "stream1.write"}],
+        "filters": {"filter1": {"type": "txfilter", "for": "stream1", "code": "filter1.js", "approve": true}},
+        "upgrades": {"upgrade1": {"params": {"max-std-element-size": 60000}, "approve": true}}
+    }
+
+Addresses are referred to by alias; ``admin`` is the node's first admin address. Filter code is read from a file
+relative to the scenario, if such a file exists. Every entry becomes one or more steps. A step that uses an
+entity, or an address that it needs a granted permission of, depends on the confirmation of the step that created
+it; steps without dependencies between them run concurrently.
+"""
+import json
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, NamedTuple, Set, Tuple
+
+from .rpc_api import RpcApi
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+ADMIN = "admin"
+CONFIRM_TIMEOUT = 120
+
+Results = Dict[str, Any]
+
+
+class Step(NamedTuple):
+    action: Callable[[Results], Any]
+    deps: List[str]
+
+
+def load_scenario(path: Path) -> Dict[str, Any]:
+    with open(str(path)) as f:
+        if path.suffix.lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError("YAML scenarios require the PyYAML package")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class Scenario:
+    """ The steps of a scenario document, keyed by name (``kind:entity``). """
+
+    def __init__(self, api: RpcApi, spec: Dict[str, Any], folder: Path = Path('.')):
+        self.api = api
+        self.folder = folder
+        self.steps: Dict[str, Step] = {}
+        self.entities = {name: kind for kind in ("stream", "asset") for name in spec.get(f"{kind}s", {})}
+        self.grants: Dict[str, List[Tuple[str, str]]] = {}
+        for alias, address in spec.get("addresses", {}).items():
+            if (address or {}).get("permissions"):
+                self.grants.setdefault(alias, []).append((f"grant:{alias}", address["permissions"]))
+        for index, grant in enumerate(spec.get("permissions", [])):
+            self.grants.setdefault(grant["address"], []).append((f"permission:{index}", grant["permissions"]))
+        self.add(f"address:{ADMIN}", lambda results: api.checked_command("listpermissions", "admin")[0]["address"])
+        for alias, address in spec.get("addresses", {}).items():
+            self.add_address(alias, address or {})
+        for name, stream in spec.get("streams", {}).items():
+            self.add_stream(name, stream or {})
+        for name, asset in spec.get("assets", {}).items():
+            self.add_asset(name, asset or {})
+        for index, grant in enumerate(spec.get("permissions", [])):
+            self.add_grant(f"permission:{index}", grant["address"], grant["permissions"])
+        for name, filter_spec in spec.get("filters", {}).items():
+            self.add_filter(name, filter_spec)
+        for name, upgrade in spec.get("upgrades", {}).items():
+            self.add_upgrade(name, upgrade)
+
+    def add(self, name: str, action: Callable[[Results], Any], deps: List[str] = None, confirm: bool = False):
+        """ Add step `name`; with `confirm`, a ``confirm:name`` step waits until its transaction is mined. """
+        self.steps[name] = Step(action, deps or [])
+        if confirm:
+            self.steps[f"confirm:{name}"] = Step(
+                lambda results: self.api.wait_for_tx(results[name], timeout=CONFIRM_TIMEOUT), [name])
+
+    def address_deps(self, alias: str, needed: Set[str]) -> List[str]:
+        """ Get the steps that create address `alias` and confirm its grants of any of the `needed` permissions. """
+        return [f"address:{alias}"] + [f"confirm:{name}" for name, permissions in self.grants.get(alias, [])
+                                       if needed & self.permission_set(permissions)]
+
+    @staticmethod
+    def permission_set(permissions: str) -> Set[str]:
+        return {permission.strip() for permission in permissions.split(',') if permission.strip()}
+
+    @classmethod
+    def referenced_entities(cls, permissions: str) -> Set[str]:
+        return {permission.split('.')[0] for permission in cls.permission_set(permissions) if '.' in permission}
+
+    def entity_deps(self, permissions: str) -> List[str]:
+        """ Get the confirmations of the entities that ``entity.permission`` items in `permissions` refer to. """
+        return [f"confirm:{self.entities[entity]}:{entity}" for entity in sorted(self.referenced_entities(permissions))
+                if entity in self.entities]
+
+    def add_address(self, alias: str, spec: Dict[str, Any]):
+        self.add(f"address:{alias}", lambda results: self.api.checked_command("getnewaddress"))
+        if spec.get("permissions"):
+            self.add_grant(f"grant:{alias}", alias, spec["permissions"])
+
+    def add_grant(self, name: str, alias: str, permissions: str):
+        def grant(results: Results) -> str:
+            return self.api.checked_command("grant", results[f"address:{alias}"], permissions)
+        self.add(name, grant, [f"address:{alias}"] + self.entity_deps(permissions), confirm=True)
+
+    def add_stream(self, name: str, spec: Dict[str, Any]):
+        self.add(f"stream:{name}", lambda results: self.api.checked_command(
+            "create", "stream", name, spec.get("restrict", spec.get("open", True))), confirm=True)
+        for index, item in enumerate(spec.get("items", [])):
+            publisher = item.get("from", ADMIN)
+
+            def publish(results: Results, item=item, publisher=publisher) -> str:
+                keys = item.get("keys", item.get("key", []))
+                return self.api.checked_command("publishfrom", results[f"address:{publisher}"], name, keys,
+                                                item["data"], *([item["options"]] if "options" in item else []))
+            self.add(f"publish:{name}:{index}", publish,
+                     [f"confirm:stream:{name}"] + self.address_deps(publisher, {"send", f"{name}.write"}))
+
+    def add_asset(self, name: str, spec: Dict[str, Any]):
+        issuer = spec.get("issuer", ADMIN)
+
+        def issue(results: Results) -> str:
+            params = {"name": name, "open": spec.get("open", False)}
+            if "restrict" in spec:
+                params["restrict"] = spec["restrict"]
+            return self.api.checked_command("issuefrom", results[f"address:{ADMIN}"], results[f"address:{issuer}"],
+                                            params, spec.get("quantity", 0), spec.get("units", 1), 0,
+                                            spec.get("details", {}))
+        self.add(f"asset:{name}", issue, sorted(set(self.address_deps(issuer, {"receive"}) + [f"address:{ADMIN}"])),
+                 confirm=True)
+        for index, transfer in enumerate(spec.get("transfers", [])):
+            source = transfer.get("from", issuer)
+
+            def send(results: Results, transfer=transfer, source=source) -> str:
+                return self.api.checked_command("sendfrom", results[f"address:{source}"],
+                                                results[f"address:{transfer['to']}"], {name: transfer["quantity"]})
+            self.add(f"transfer:{name}:{index}", send,
+                     [f"confirm:asset:{name}"] + self.address_deps(source, {"send", f"{name}.send"})
+                     + self.address_deps(transfer["to"], {"receive", f"{name}.receive"}))
+
+    def add_filter(self, name: str, spec: Dict[str, Any]):
+        code_path = self.folder / spec["code"]
+        code = code_path.read_text() if code_path.is_file() else spec["code"]
+        kind = spec.get("type", "txfilter")
+        restrictions = {"for": spec["for"]} if kind == "txfilter" and "for" in spec else {}
+        deps = [f"confirm:{self.entities[spec['for']]}:{spec['for']}"] if spec.get("for") in self.entities else []
+        self.add(f"filter:{name}", lambda results: self.api.checked_command("create", kind, name, restrictions, code),
+                 deps, confirm=spec.get("approve", False))
+        if spec.get("approve", False):
+            self.add(f"approve:{name}", lambda results: self.api.checked_command(
+                "approvefrom", results[f"address:{ADMIN}"], name, self.approval(kind, spec)),
+                     [f"confirm:filter:{name}", f"address:{ADMIN}"])
+
+    @staticmethod
+    def approval(kind: str, spec: Dict[str, Any]) -> Any:
+        if kind == "streamfilter":
+            return {"for": spec["for"], "approve": True}
+        return True
+
+    def add_upgrade(self, name: str, spec: Dict[str, Any]):
+        self.add(f"upgrade:{name}", lambda results: self.api.checked_command(
+            "create", "upgrade", name, False, spec.get("params", {})), confirm=spec.get("approve", False))
+        if spec.get("approve", False):
+            self.add(f"approve:{name}", lambda results: self.api.checked_command(
+                "approvefrom", results[f"address:{ADMIN}"], name, True),
+                     [f"confirm:upgrade:{name}", f"address:{ADMIN}"])
+
+
+class ScenarioExecutor:
+    """ Run the steps of a `Scenario` on `workers` threads, each as soon as its dependencies are done. """
+
+    def __init__(self, logger: logging.Logger, workers: int = 8):
+        self.logger = logger
+        self.workers = workers
+
+    def run(self, steps: Dict[str, Step]) -> Results:
+        """ Run `steps` and return their results by name; raise `RuntimeError` if any step fails. """
+        for name, step in steps.items():
+            missing = [dep for dep in step.deps if dep not in steps]
+            if missing:
+                raise ValueError(f"Step {name} depends on unknown steps {missing}")
+        results: Results = {}
+        failed: Dict[str, str] = {}
+        waiting = dict(steps)
+        running: Dict[Future, str] = {}
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while waiting or running:
+                for name, step in list(waiting.items()):
+                    if any(dep in failed for dep in step.deps):
+                        failed[name] = "dependency failed"
+                        del waiting[name]
+                    elif all(dep in results for dep in step.deps):
+                        running[executor.submit(self.run_step, name, step, results)] = name
+                        del waiting[name]
+                if not running:
+                    if waiting:
+                        raise ValueError(f"Circular dependencies between steps {list(waiting)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Step {name} failed: {e}")
+                        failed[name] = str(e)
+        self.logger.info(f"Ran {len(results)} of {len(steps)} steps in {perf_counter() - start:.2f} sec")
+        if failed:
+            raise RuntimeError(f"{len(failed)} steps failed or were skipped: {', '.join(failed)}")
+        return results
+
+    def run_step(self, name: str, step: Step, results: Results) -> Any:
+        start = perf_counter()
+        result = step.action(results)
+        self.logger.debug(f"{name} done in {perf_counter() - start:.2f} sec")
+        return result
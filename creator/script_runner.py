@@ -0,0 +1,193 @@
+""" Run the bash command lists built with `mkchain_utils.gen_commands` in-process through one `RpcApi`.
+
+Supported lines are the ones the script builders emit:
+
+* ``multichain-cli CHAIN cmd args...``, optionally as ``var=`...``` and piped through ``sed -n -E 's/re/repl/p'``
+* ``var="value"`` assignments and ``read -r -d '' var <<- END`` here-documents
+* ``sleep N``, comments and ``set``/``export`` lines, which are ignored
+
+Shell variables are kept in `ScriptRunner.variables`. Arguments are converted like ``multichain-cli`` does:
+JSON objects, arrays, booleans and numbers are parsed, anything else is passed as a string.
+"""
+import json
+import logging
+import pprint
+import re
+from time import perf_counter, sleep
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .rpc_api import RpcApi
+
+ASSIGN_COMMAND = re.compile(r"^(\w+)=`(.*)`$")
+ASSIGN_VALUE = re.compile(r"^(\w+)=(.*)$")
+HEREDOC = re.compile(r"^read -r -d '' (\w+) <<-? *(\w+)$")
+VARIABLE = re.compile(r"\$(\w+)|\$\{(\w+)\}")
+NUMBER = re.compile(r"^-?(0|[1-9]\d{0,15})(\.\d+)?$")
+SED_SUBSTITUTE = re.compile(r"^s/((?:[^/\\]|\\.)*)/((?:[^/\\]|\\.)*)/p$")
+IGNORED_PREFIXES = ("#", "set ", "export ", "echo ")
+
+
+class ScriptError(Exception):
+    """ A script line cannot be run in-process. """
+
+
+class ScriptRunner:
+    def __init__(self, logger: logging.Logger, api: RpcApi):
+        self.logger = logger
+        self.api = api
+        self.variables: Dict[str, Any] = {}
+        self.calls = 0
+        self.errors = 0
+
+    def run(self, commands: List[str]):
+        """ Run a command list, where an item may hold several lines. """
+        start = perf_counter()
+        lines = iter([line for command in commands for line in command.split('\n')])
+        for line in lines:
+            self.run_line(line.strip(), lines)
+        self.logger.info(f"Ran {self.calls:,} commands ({self.errors:,} failed) in {perf_counter() - start:.2f} sec")
+
+    def run_line(self, line: str, lines: Iterator[str]):
+        if not line or line.startswith(IGNORED_PREFIXES):
+            return
+        match = HEREDOC.match(line)
+        if match:
+            body = []
+            for body_line in lines:
+                if body_line.strip() == match.group(2):
+                    break
+                body.append(body_line.lstrip('\t'))
+            self.variables[match.group(1)] = '\n'.join(body)
+            return
+        match = ASSIGN_COMMAND.match(line)
+        if match:
+            self.variables[match.group(1)] = self.run_pipeline(match.group(2))
+            return
+        match = ASSIGN_VALUE.match(line)
+        if match:
+            words = self.split(match.group(2))
+            self.variables[match.group(1)] = words[0] if words else ""
+            return
+        if line.startswith("multichain-cli "):
+            result = self.run_pipeline(line)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for text in pprint.pformat(result).split('\n'):
+                    self.logger.debug(text)
+            return
+        words = self.split(line)
+        if words[0] == "sleep" and len(words) == 2:
+            sleep(float(words[1]))
+            return
+        raise ScriptError(f"Unsupported script line: {line}")
+
+    def run_pipeline(self, pipeline: str) -> Any:
+        """ Run ``multichain-cli ...`` with an optional ``| sed`` stage, and return the value bash would capture. """
+        stages = self.split_pipeline(pipeline)
+        words = self.split(stages[0])
+        if len(words) < 3 or words[0] != "multichain-cli":
+            raise ScriptError(f"Unsupported command: {stages[0]}")
+        result = self.call(words[2], [self.convert(word) for word in words[3:]])
+        for stage in stages[1:]:
+            result = self.sed(self.split(stage), result)
+        return result
+
+    def call(self, cmd: str, args: List[Any]) -> Any:
+        self.calls += 1
+        result = self.api.command(cmd, *args)
+        if isinstance(result, dict) and result.get("error") is not None:
+            # multichain-cli writes errors to stderr, so bash captures nothing
+            self.errors += 1
+            return ""
+        return result
+
+    @staticmethod
+    def output(result: Any) -> str:
+        """ Format `result` the way ``multichain-cli`` prints it. """
+        if isinstance(result, str):
+            return result
+        return json.dumps(result, indent=4)
+
+    def sed(self, words: List[str], result: Any) -> str:
+        """ Apply ``sed -n -E 's/re/repl/p'`` to the printed `result`. """
+        if words[0] != "sed" or "-n" not in words or "-E" not in words:
+            raise ScriptError(f"Unsupported pipeline stage: {' '.join(words)}")
+        match = SED_SUBSTITUTE.match(words[-1])
+        if match is None:
+            raise ScriptError(f"Unsupported sed expression: {words[-1]}")
+        pattern = re.compile(match.group(1))
+        lines = [pattern.sub(match.group(2), line) for line in self.output(result).split('\n') if pattern.search(line)]
+        return '\n'.join(lines)
+
+    @staticmethod
+    def split_pipeline(pipeline: str) -> List[str]:
+        stages = []
+        quote = None
+        start = 0
+        for i, char in enumerate(pipeline):
+            if quote:
+                quote = None if char == quote and pipeline[i - 1] != '\\' else quote
+            elif char in "'\"":
+                quote = char
+            elif char == '|':
+                stages.append(pipeline[start:i].strip())
+                start = i + 1
+        stages.append(pipeline[start:].strip())
+        return stages
+
+    def expand(self, text: str) -> str:
+        def value(match) -> str:
+            name = match.group(1) or match.group(2)
+            return self.output(self.variables.get(name, ""))
+        return VARIABLE.sub(value, text)
+
+    def split(self, line: str) -> List[str]:
+        """ Split `line` into words like bash: expand variables outside single quotes and remove the quotes. """
+        words: List[str] = []
+        word: List[str] = []
+        in_word = False
+        i = 0
+        while i < len(line):
+            char = line[i]
+            if char.isspace():
+                if in_word:
+                    words.append(''.join(word))
+                    word, in_word = [], False
+                i += 1
+                continue
+            in_word = True
+            if char == "'":
+                end = line.index("'", i + 1)
+                word.append(line[i + 1:end])
+                i = end + 1
+            elif char == '"':
+                text, i = self.double_quoted(line, i + 1)
+                word.append(self.expand(text))
+            else:
+                end = i
+                while end < len(line) and not line[end].isspace() and line[end] not in "'\"":
+                    end += 1
+                word.append(self.expand(line[i:end]))
+                i = end
+        if in_word:
+            words.append(''.join(word))
+        return words
+
+    @staticmethod
+    def double_quoted(line: str, start: int) -> Tuple[str, int]:
+        text = []
+        i = start
+        while line[i] != '"':
+            if line[i] == '\\' and i + 1 < len(line) and line[i + 1] in '"\\$`':
+                i += 1
+            text.append(line[i])
+            i += 1
+        return ''.join(text), i + 1
+
+    @staticmethod
+    def convert(word: str) -> Any:
+        if word in ("true", "false") or NUMBER.match(word) or word[:1] in "{[":
+            try:
+                return json.loads(word)
+            except ValueError:
+                pass
+        return word
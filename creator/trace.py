@@ -0,0 +1,156 @@
+""" Record JSON-API calls to a JSONL trace and replay traces against another node.
+
+Every trace line holds the call start time, method, params, latency, result size and error flag. Results are kept
+too when they are small, so the replayer can map the addresses and txids a recorded call returned to the ones
+returned by the replayed call, and substitute them in the params of later calls.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import perf_counter, sleep, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import CallMetrics
+
+MAX_RECORDED_RESULT = 4096
+MIN_ID_LENGTH = 20
+
+
+class TraceRecorder:
+    """ Thread-safe writer of one JSONL line per call. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "w")
+        self.calls = 0
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def record(self, method: str, params: List[Any], latency: float, result: Any):
+        error = isinstance(result, dict) and result.get("error") is not None
+        text = json.dumps(result)
+        entry = {"time": time() - latency, "method": method, "params": params, "latency": latency,
+                 "size": len(text), "error": error}
+        if len(text) <= MAX_RECORDED_RESULT and not error:
+            entry["result"] = result
+        line = json.dumps(entry) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.calls += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def leaf_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield from value.split(',')
+    elif isinstance(value, list):
+        for item in value:
+            yield from leaf_strings(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from leaf_strings(key)
+            yield from leaf_strings(item)
+
+
+class TraceReplayer:
+    """ Re-issue the calls of a trace through `api`.
+
+    With `speed` 1 calls are sent at their recorded offsets, with `speed` N that many times faster, and with
+    `speed` None as fast as `concurrency` allows. A call whose params contain a value returned by a recorded call
+    still in flight waits for that call, and gets the value the replayed call returned instead.
+    """
+
+    def __init__(self, logger: logging.Logger, api, speed: Optional[float] = 1.0, concurrency: int = 8):
+        self.logger = logger
+        self.api = api
+        self.speed = speed
+        self.concurrency = concurrency
+        self.substitutes: Dict[str, str] = {}
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.late = 0
+
+    def learn(self, recorded: Any, replayed: Any):
+        """ Map the ids in a recorded result to those at the same place in the replayed result. """
+        if isinstance(recorded, str) and isinstance(replayed, str):
+            if recorded != replayed and len(recorded) >= MIN_ID_LENGTH:
+                with self.lock:
+                    self.substitutes[recorded] = replayed
+        elif isinstance(recorded, list) and isinstance(replayed, list) and len(recorded) == len(replayed):
+            for recorded_item, replayed_item in zip(recorded, replayed):
+                self.learn(recorded_item, replayed_item)
+        elif isinstance(recorded, dict) and isinstance(replayed, dict):
+            for key in recorded.keys() & replayed.keys():
+                self.learn(recorded[key], replayed[key])
+
+    def substitute(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return ','.join(self.substitutes.get(part, part) for part in value.split(','))
+        if isinstance(value, list):
+            return [self.substitute(item) for item in value]
+        if isinstance(value, dict):
+            return {self.substitute(key): self.substitute(item) for key, item in value.items()}
+        return value
+
+    def call(self, entry: Dict[str, Any], dependencies: List[Future]) -> Any:
+        for dependency in dependencies:
+            dependency.result()
+        result = self.api.command(entry["method"], *self.substitute(entry["params"]), is_log=False)
+        if "result" in entry:
+            self.learn(entry["result"], result)
+        return result
+
+    def replay(self, entries: Iterator[Dict[str, Any]]) -> float:
+        """ Replay `entries` and return the elapsed time. """
+        start = perf_counter()
+        first = None
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for entry in entries:
+                if self.speed:
+                    first = entry["time"] if first is None else first
+                    delay = start + (entry["time"] - first) / self.speed - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
+                    elif delay < -0.01:
+                        self.late += 1
+                with self.lock:
+                    dependencies = {self.pending[value] for value in leaf_strings(entry["params"])
+                                    if value in self.pending}
+                future = executor.submit(self.call, entry, list(dependencies))
+                if "result" in entry:
+                    with self.lock:
+                        for value in leaf_strings(entry["result"]):
+                            if len(value) >= MIN_ID_LENGTH:
+                                self.pending[value] = future
+                futures.append(future)
+            for future in futures:
+                future.result()
+        return perf_counter() - start
+
+
+def summarize(path: str) -> Tuple[CallMetrics, float]:
+    """ Get the recorded call counts and latencies of a trace, and the time it spans. """
+    metrics = CallMetrics()
+    first = last = None
+    for entry in read_trace(path):
+        metrics.record(entry["method"], entry["latency"], entry["error"])
+        first = entry["time"] if first is None else min(first, entry["time"])
+        last = max(last or 0.0, entry["time"] + entry["latency"])
+    return metrics, (last - first) if first is not None else 0.0
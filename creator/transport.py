@@ -0,0 +1,91 @@
+import itertools
+import json
+import logging
+from typing import Any, Dict, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+log = logging.getLogger(__name__)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def is_connect_error(error: requests.ConnectionError) -> bool:
+    """ Tell whether `error` happened while connecting, before any of the request was sent. """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class RpcTransport:
+    """ JSON-RPC client for a MultiChain node over a pool of keep-alive HTTP connections.
+
+    All requests share one `requests.Session`, so TCP connections are reused instead of being opened per call.
+    A request that fails because the connection could not be opened is resent up to `retries` times. Failures
+    after the request may have reached the node are not retried, so a publish or send is never submitted twice.
+    """
+
+    def __init__(self, url: str, auth: Tuple[str, str], chain_name: str, pool_size: int = 10,
+                 timeout: Timeout = (3.05, 60), retries: int = 2):
+        self.url = url
+        self.chain_name = chain_name
+        self.timeout = timeout
+        self.retries = retries
+        self.retried = 0
+        self.request_ids = itertools.count(1)
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers["Content-Type"] = "application/json"
+        self.session.mount("http://", self.adapter)
+
+    def post(self, payload: Any, is_log: bool = True) -> Any:
+        """ Send a JSON-RPC request (or batch) and return the decoded response body. """
+        encoded = json.dumps(payload)
+        if is_log:
+            log.info(f"Request: {encoded}")
+        for attempt in itertools.count():
+            try:
+                response = self.session.post(self.url, data=encoded, timeout=self.timeout)
+                break
+            except requests.ConnectionError as e:
+                if attempt >= self.retries or not is_connect_error(e):
+                    raise
+                self.retried += 1
+                log.warning(f"Connection failed ({e}), retrying")
+        reply = response.json()
+        if is_log:
+            log.info(f"Response: {reply}")
+        return reply
+
+    def call(self, method: str, *params, is_log: bool = True) -> Any:
+        """ Issue a single JSON-API command.
+
+        Like Savoir, return the result on success and the whole response (with its 'error' member) on failure.
+        """
+        payload = {"method": method, "params": params, "id": next(self.request_ids),
+                   "chain_name": self.chain_name}
+        reply = self.post(payload, is_log)
+        if reply.get("error") is not None:
+            log.error(f"{method} failed: {reply['error']}")
+            return reply
+        return reply["result"]
+
+    def stats(self) -> Dict[str, int]:
+        """ Get connection reuse counters for the pool. """
+        pools = self.adapter.poolmanager.pools
+        pools = [pools[key] for key in pools.keys()]
+        requests_sent = sum(pool.num_requests for pool in pools)
+        connections = sum(pool.num_connections for pool in pools)
+        return {
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": requests_sent - connections,
+            "retries": self.retried,
+        }
+
+    def close(self):
+        self.session.close()
@@ -1,7 +1,7 @@
-import random
-import string
+from .payload import PayloadPool
+
+payloads = PayloadPool()
 
 
 def rand_string(size: int, is_hex: bool) -> str:
-    chars = string.hexdigits if is_hex else string.printable
-    return ''.join(random.choices(chars, k=size))
+    return payloads.string("hexdigits" if is_hex else "printable", size)
@@ -0,0 +1,55 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.export import FORMATS, StreamExporter
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Export stream items to compressed files", parents=[chain.options_parser()])
+    parser.add_argument("streams", metavar="STREAM", nargs="+", help="streams to export")
+    parser.add_argument("-k", "--key", metavar="KEY", action="append",
+                        help="export only the items with KEY, may be repeated (default: all items)")
+    parser.add_argument("-o", "--output", metavar="DIR", default="export",
+                        help="output folder, also holding the resume checkpoint (default: %(default)s)")
+    parser.add_argument("-f", "--format", choices=list(FORMATS), default="jsonl",
+                        help="gzipped JSON lines or Parquet, which needs pyarrow (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, metavar="N", default=RpcApi.DEFAULT_PAGE_SIZE,
+                        help="items per request and per part file, fixed for a resumed export (default: %(default)s)")
+    parser.add_argument("--workers", type=int, metavar="N", default=4,
+                        help="parallel page fetches (default: %(default)s)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Streams", ', '.join(options.streams)))
+    option_display.append(("Keys", ', '.join(options.key) if options.key else "all"))
+    option_display.append(("Output", options.output))
+    option_display.append(("Format", options.format))
+    option_display.append(("Page size", options.page_size))
+    option_display.append(("Workers", options.workers))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, pool_size=options.workers,
+                 datadir=chain.datadir, notifier=chain.notifier)
+    exporter = StreamExporter(logger, api, Path(options.output), options.format, options.page_size, options.workers)
+    exporter.export(options.streams, options.key)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.asset_load import AssetLoad
+from creator.chain import Chain
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Transfer an asset among a pool of addresses at a target rate",
+                            parents=[chain.options_parser()])
+    parser.add_argument("-a", "--asset", metavar="NAME", default="asset1",
+                        help="asset to transfer (default: %(default)s)")
+    parser.add_argument("--issue", action="store_true", help="issue the asset to the funding address first")
+    parser.add_argument("--from", dest="from_address", metavar="ADDRESS",
+                        help="funding address (default: the first address with issue permission)")
+    parser.add_argument("-n", "--addresses", type=int, metavar="N", default=100,
+                        help="number of addresses in the pool (default: %(default)s)")
+    parser.add_argument("--fund", type=float, metavar="QTY", default=1000,
+                        help="asset quantity each address is topped up to (default: %(default)s)")
+    parser.add_argument("--amount", type=float, metavar="QTY", default=1,
+                        help="asset quantity per transfer (default: %(default)s)")
+    parser.add_argument("--pipeline", choices=["raw", "send"], default="raw",
+                        help="raw: keystore addresses, signed with signrawtransaction and sent with"
+                             " sendrawtransaction; send: wallet addresses sent by createrawsendfrom (default: raw)")
+    parser.add_argument("--keystore", metavar="FILE",
+                        help="keypairs of the raw pipeline (default: DATADIR/CHAIN-keystore.json)")
+    parser.add_argument("-r", "--rate", type=float, metavar="TX/SEC", help="target transfer rate (default: no limit)")
+    parser.add_argument("--duration", type=float, metavar="SEC", default=60,
+                        help="seconds to run (default: %(default)s)")
+    parser.add_argument("--count", type=int, metavar="N", help="stop after N transfers")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=8,
+                        help="transfers in flight (default: %(default)s)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    options.keystore = Path(options.keystore) if options.keystore else chain.datadir / f"{chain.name}-keystore.json"
+    option_display.append(("Asset", options.asset))
+    option_display.append(("Addresses", options.addresses))
+    option_display.append(("Fund / amount", f"{options.fund} / {options.amount}"))
+    option_display.append(("Pipeline", options.pipeline))
+    option_display.append(("Rate", f"{options.rate}/sec" if options.rate else "unlimited"))
+    option_display.append(("Duration", f"{options.duration} sec"))
+    if options.count:
+        option_display.append(("Count", options.count))
+    option_display.append(("Concurrency", options.concurrency))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def wallet_addresses(api: RpcApi, count: int):
+    addresses = [result.result for result in api.command_batch([("getnewaddress",)] * count)]
+    for offset in range(0, count, RpcApi.DEFAULT_ADDRESS_BATCH_SIZE):
+        api.checked_command("grant", ','.join(addresses[offset:offset + RpcApi.DEFAULT_ADDRESS_BATCH_SIZE]),
+                            "send,receive", is_log=False)
+    return [{"address": address} for address in addresses]
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency + 2,
+                 datadir=chain.datadir, notifier=chain.notifier)
+    from_address = options.from_address or api.checked_command("listpermissions", "issue")[0]["address"]
+    if options.issue:
+        tx_id = api.print_tx("issuefrom", from_address, from_address, {"name": options.asset, "open": True},
+                             options.addresses * options.fund * 10, min(1, options.amount), 0)
+        api.wait_for_tx(tx_id)
+    if options.pipeline == "raw":
+        keypairs = api.provision_addresses(options.addresses, "send,receive", options.keystore)
+    else:
+        keypairs = wallet_addresses(api, options.addresses)
+
+    load = AssetLoad(logger, api, options.asset, keypairs, options.amount, options.concurrency)
+    load.fund(from_address, options.fund)
+    load.run(options.duration, options.count, options.rate)
+    return 1 if load.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,30 +1,58 @@
+import asyncio
 import logging
 import sys
 from argparse import ArgumentParser
+from contextlib import nullcontext
+from multiprocessing import Pool
 from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Optional
 
+from creator.async_rpc_api import AsyncRpcApi
 from creator.chain import Chain
+from creator.metrics import CallMetrics, SnapshotWriter
+from creator.open_loop import OpenLoopLoad, RateSchedule, parse_rate
 from creator.rpc_api import RpcApi
-from creator.utils import rand_string
+from creator.trace import TraceRecorder
+from creator.utils import payloads, rand_string
 
 module_name = Path(__file__).stem
 logger = logging.getLogger(module_name)
 CONST_PUBLISH_KEY_SIZE = 16
 CONST_PUBLISH_VALUE_SIZE = 32
+FILTER_APPROVAL_TIMEOUT = 120
 
 
 def create_tx_filter(api: RpcApi, stream_name: str, filter_name: str, jsfilter: str):
     address = api.command("listaddresses")[0]["address"]
     api.print_tx("create", "txfilter", filter_name, {"for": stream_name}, jsfilter)
-    api.print_tx("approvefrom", address, filter_name, True)
-    # wait_for_mining(options, api)
+    tx_id = api.print_tx("approvefrom", address, filter_name, True)
+    api.wait_for_tx(tx_id, timeout=FILTER_APPROVAL_TIMEOUT)
 
 
 def create_stream_filter(api: RpcApi, stream_name: str, filter_name: str, jsfilter: str):
     address = api.command("listaddresses")[0]["address"]
     api.print_tx("create", "streamfilter", filter_name, {}, jsfilter)
-    api.print_tx("approvefrom", address, filter_name, {"for": stream_name, "approve": True})
-    # wait_for_mining(options, api)
+    tx_id = api.print_tx("approvefrom", address, filter_name, {"for": stream_name, "approve": True})
+    api.wait_for_tx(tx_id, timeout=FILTER_APPROVAL_TIMEOUT)
+
+
+GOOD_TX_SCRIPT = """
+var filtertransaction = function () {
+    var tx = getfiltertransaction();
+    if (tx.vout.length < 2) {
+        return 'Two transaction outputs required';
+    }
+};
+"""
+GOOD_STREAM_SCRIPT = """
+function filterstreamitem () {
+    var tx = getfilterstreamitem();
+    if (tx.vout.length < 2) {
+        return 'Two transaction outputs required';
+    }
+};
+"""
 
 
 def create_permissions(api: RpcApi):
@@ -32,19 +60,147 @@ def create_permissions(api: RpcApi):
     api.print_tx("grant", address, "send,receive,high1,low3")
 
 
-def publish(api: RpcApi, repeats: int, stream_name: str):
-    for counter in range(repeats):
-        key = rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False)
-        value = rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True)
-        api.command("publish", stream_name, key, value)
-        if not logger.isEnabledFor(logging.DEBUG):
-            if counter % 100 == 0:
-                print()
-                print(f"{counter:8,}: ", end='', flush=True)
-            print('.', end='', flush=True)
+def setup_chain(api: RpcApi, stream_name: str):
+    create_permissions(api)
+    api.command("create", "stream", stream_name, True)
+    create_tx_filter(api, stream_name, "txflt1", GOOD_TX_SCRIPT)
+    create_stream_filter(api, stream_name, "strmflt1", GOOD_STREAM_SCRIPT)
+
+    filters = api.print_command("listtxfilters", is_log=False)
+    for name in (flt["name"] for flt in filters):
+        api.print_command("getfiltercode", name, is_log=False)
+
+    filters = api.print_command("liststreamfilters", is_log=False)
+    for name in (flt["name"] for flt in filters):
+        api.print_command("getfiltercode", name, is_log=False)
+
+
+def print_progress(counter: int):
+    if not logger.isEnabledFor(logging.DEBUG):
+        if counter % 100 == 0:
+            print()
+            print(f"{counter:8,}: ", end='', flush=True)
+        print('.', end='', flush=True)
+
+
+def publish(api: RpcApi, repeats: int, stream_name: str, batch_size: int = 1) -> float:
+    start = perf_counter()
+    if batch_size > 1:
+        publish_batched(api, repeats, stream_name, batch_size)
+    else:
+        for counter in range(repeats):
+            key = rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False)
+            value = rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True)
+            api.command("publish", stream_name, key, value)
+            print_progress(counter)
     print()
+    elapsed = perf_counter() - start
+    api.wait_for_mining()
+    logger.info("publish done")
+    return elapsed
+
+
+def publish_batched(api: RpcApi, repeats: int, stream_name: str, batch_size: int):
+    errors = 0
+    for start in range(0, repeats, batch_size):
+        calls = [("publish", stream_name,
+                  rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False),
+                  rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True))
+                 for _ in range(min(batch_size, repeats - start))]
+        for counter, result in enumerate(api.command_batch(calls, batch_size), start):
+            if result.error:
+                errors += 1
+                logger.debug(f"publish #{counter} failed: {result.error}")
+            print_progress(counter)
+    if errors:
+        print()
+        logger.warning(f"{errors:,} of {repeats:,} publish calls failed")
+
+
+async def publish_concurrent(api: AsyncRpcApi, repeats: int, stream_name: str) -> float:
+    counters = iter(range(repeats))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for counter in counters:
+            key = rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False)
+            value = rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True)
+            result = await api.command("publish", stream_name, key, value, is_log=False)
+            if isinstance(result, dict) and result.get("error"):
+                errors += 1
+            print_progress(counter)
+
+    async with api:
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(api.concurrency)))
+        elapsed = perf_counter() - start
+        print()
+        if errors:
+            logger.warning(f"{errors:,} of {repeats:,} publish calls failed")
+        await api.wait_for_mining()
+    logger.info("publish done")
+    return elapsed
+
+
+async def publish_open_loop(api: AsyncRpcApi, schedule: RateSchedule, stream_name: str) -> float:
+    def make_call(counter: int):
+        return ("publish", stream_name, rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False),
+                rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True))
+
+    async with api:
+        elapsed = await OpenLoopLoad(logger, api, schedule).run(make_call)
+        await api.wait_for_mining()
+    logger.info("publish done")
+    return elapsed
+
+
+def publish_worker(chain_name: str, worker: int, repeats: int, stream_name: str, key_prefix: str,
+                   seed: Optional[int]) -> Dict[str, Any]:
+    """ Publish `repeats` items from a worker process with its own RpcApi and return its measurements. """
+    payloads.reseed(None if seed is None else seed + worker)
+    api = RpcApi(logger, chain_name, metrics=CallMetrics())
+    errors = 0
+    start = perf_counter()
+    for _ in range(repeats):
+        key = key_prefix + rand_string(CONST_PUBLISH_KEY_SIZE, is_hex=False)
+        value = rand_string(CONST_PUBLISH_VALUE_SIZE, is_hex=True)
+        result = api.command("publish", stream_name, key, value, is_log=False)
+        if isinstance(result, dict) and result.get("error"):
+            errors += 1
+    return {"worker": worker, "calls": repeats, "errors": errors, "elapsed": perf_counter() - start,
+            "metrics": api.metrics.to_dict()}
+
+
+def publish_multiprocess(api: RpcApi, workers: int, repeats: int, stream_name: str, stream_per_worker: bool,
+                         seed: Optional[int] = None):
+    jobs = []
+    for worker in range(workers):
+        worker_repeats = repeats // workers + (1 if worker < repeats % workers else 0)
+        if stream_per_worker:
+            worker_stream = f"{stream_name}_{worker}"
+            api.command("create", "stream", worker_stream, True)
+            jobs.append((api.chain.name, worker, worker_repeats, worker_stream, "", seed))
+        else:
+            jobs.append((api.chain.name, worker, worker_repeats, stream_name, f"w{worker}-", seed))
+
+    logger.info(f"Starting {workers} publish workers")
+    start = perf_counter()
+    with Pool(workers) as pool:
+        reports = pool.starmap(publish_worker, jobs)
+    elapsed = perf_counter() - start
+
+    calls = sum(report["calls"] for report in reports)
+    errors = sum(report["errors"] for report in reports)
+    for report in reports:
+        logger.info(f"  worker {report['worker']}: {report['calls']:,} calls, {report['errors']:,} errors,"
+                    f" {report['calls'] / report['elapsed']:,.0f} calls/sec")
+        if api.metrics is not None:
+            api.metrics.merge(CallMetrics.from_dict(report["metrics"]))
+    logger.info(f"Total: {calls:,} calls, {errors:,} errors in {elapsed:.2f} sec, {calls / elapsed:,.0f} calls/sec")
     api.wait_for_mining()
     logger.info("publish done")
+    return elapsed
 
 
 def get_options(chain: Chain):
@@ -53,6 +209,36 @@ def get_options(chain: Chain):
     parser.add_argument("-s", "--stream", metavar="NAME", default="stream1", help="stream name (default: %(default)s)")
     parser.add_argument("-n", "--repeats", type=int, metavar="N", default=1000,
                         help="number of transactions to publish (default: %(default)s)")
+    parser.add_argument("-b", "--batch-size", type=int, metavar="N", default=1,
+                        help="publish calls per JSON-RPC batch request, 1 disables batching (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=0,
+                        help="publish through the asyncio client with up to N calls in flight (default: off)")
+    parser.add_argument("--rate", type=parse_rate, metavar="RATE",
+                        help="publish open-loop at RATE calls per time unit (e.g. 2000/s or 600/min) for --duration"
+                             " instead of --repeats; --concurrency caps the connections (default: off)")
+    parser.add_argument("--ramp-up", type=float, metavar="SEC", default=0,
+                        help="with --rate, raise the rate linearly from 0 over SEC seconds (default: %(default)s)")
+    parser.add_argument("--duration", type=float, metavar="SEC", default=60,
+                        help="with --rate, seconds to publish, including the ramp-up (default: %(default)s)")
+    parser.add_argument("--workers", type=int, metavar="N", default=0,
+                        help="shard publishing across N worker processes (default: off)")
+    parser.add_argument("--stream-per-worker", action="store_true",
+                        help="with --workers, give every worker its own stream instead of its own key prefix")
+    parser.add_argument("--seed", type=int, metavar="N",
+                        help="seed the payload generator for a reproducible run (default: random)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="append periodic JSONL snapshots of call statistics to FILE")
+    parser.add_argument("--metrics-interval", type=float, metavar="SEC", default=10,
+                        help="seconds between --metrics snapshots (default: %(default)s)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record the JSON-API calls of this process to a JSONL trace"
+                             " (not those of --workers or --concurrency publishing)")
+    parser.add_argument("--pool-size", type=int, metavar="N", default=10,
+                        help="maximum number of keep-alive RPC connections (default: %(default)s)")
+    parser.add_argument("--rpc-timeout", type=float, metavar="SEC", default=60,
+                        help="RPC response timeout in seconds (default: %(default)s)")
+    parser.add_argument("--rpc-retries", type=int, metavar="N", default=2,
+                        help="times to resend a call when connecting fails (default: %(default)s)")
 
     options = parser.parse_args()
 
@@ -60,56 +246,76 @@ def get_options(chain: Chain):
     option_display.append(("Create", options.init))
     option_display.append(("Stream", options.stream))
     option_display.append(("Repeats", options.repeats))
+    option_display.append(("Batch size", options.batch_size))
+    option_display.append(("Concurrency", options.concurrency or None))
+    if options.rate:
+        option_display.append(("Rate", f"{options.rate:g}/sec, {options.ramp_up:g} sec ramp-up,"
+                                       f" {options.duration:g} sec"))
+    option_display.append(("Workers", options.workers or None))
+    option_display.append(("Stream per worker", options.stream_per_worker))
+    option_display.append(("Seed", options.seed))
+    option_display.append(("Metrics file", options.metrics))
+    option_display.append(("Trace file", options.record))
+    option_display.append(("Pool size", options.pool_size))
+    option_display.append(("RPC timeout", options.rpc_timeout))
+    option_display.append(("RPC retries", options.rpc_retries))
     chain.log_options(parser, option_display)
 
     return options
 
 
+def make_api(chain: Chain, options, recorder: TraceRecorder = None) -> RpcApi:
+    return RpcApi(logger, chain.name, options.verbose, pool_size=options.pool_size,
+                  timeout=(3.05, options.rpc_timeout), retries=options.rpc_retries, notifier=chain.notifier,
+                  recorder=recorder)
+
+
 def main():
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s",
                         handlers=[logging.FileHandler(f"{module_name}.log", mode='w'),
                                   logging.StreamHandler(sys.stdout)])
     chain = Chain(logger)
     options = get_options(chain)
-
-    good_tx_script = """
-var filtertransaction = function () {
-    var tx = getfiltertransaction();
-    if (tx.vout.length < 2) {
-        return 'Two transaction outputs required';
-    }
-};
-"""
-    good_stream_script = """
-function filterstreamitem () {
-    var tx = getfilterstreamitem();
-    if (tx.vout.length < 2) {
-        return 'Two transaction outputs required';
-    }
-};
-"""
+    recorder = TraceRecorder(options.record) if options.record else None
 
     _proc = None
     if options.init:
-        _proc = chain.create()
-        api = RpcApi(logger, chain.name, options.verbose)
-        api.adjust_config()
-    else:
-        api = RpcApi(logger, chain.name, options.verbose)
-    create_permissions(api)
-    api.command("create", "stream", options.stream, True)
-    create_tx_filter(api, options.stream, "txflt1", good_tx_script)
-    create_stream_filter(api, options.stream, "strmflt1", good_stream_script)
-
-    filters = api.print_command("listtxfilters", is_log=False)
-    for name in (flt["name"] for flt in filters):
-        api.print_command("getfiltercode", name, is_log=False)
+        def populate():
+            setup_api = make_api(chain, options, recorder)
+            setup_api.adjust_config()
+            setup_chain(setup_api, options.stream)
+            if chain.template:
+                setup_api.wait_for_mining()
 
-    filters = api.print_command("liststreamfilters", is_log=False)
-    for name in (flt["name"] for flt in filters):
-        api.print_command("getfiltercode", name, is_log=False)
+        _proc = chain.create_from_template(populate)
+        api = make_api(chain, options, recorder)
+    else:
+        api = make_api(chain, options, recorder)
+        setup_chain(api, options.stream)
 
-    publish(api, options.repeats, options.stream)
+    payloads.reseed(options.seed)
+    api.metrics = CallMetrics()
+    with SnapshotWriter(api.metrics, options.metrics, options.metrics_interval) if options.metrics else nullcontext():
+        if options.rate:
+            async_api = AsyncRpcApi(logger, chain.name, options.verbose, concurrency=options.concurrency or 100,
+                                    timeout=options.rpc_timeout, metrics=api.metrics)
+            schedule = RateSchedule(options.rate, options.duration, options.ramp_up)
+            elapsed = asyncio.run(publish_open_loop(async_api, schedule, options.stream))
+        elif options.workers:
+            elapsed = publish_multiprocess(api, options.workers, options.repeats, options.stream,
+                                           options.stream_per_worker, options.seed)
+        elif options.concurrency:
+            async_api = AsyncRpcApi(logger, chain.name, options.verbose, concurrency=options.concurrency,
+                                    timeout=options.rpc_timeout, metrics=api.metrics)
+            elapsed = asyncio.run(publish_concurrent(async_api, options.repeats, options.stream))
+        else:
+            elapsed = publish(api, options.repeats, options.stream, options.batch_size)
+    api.metrics.report(logger, elapsed)
+    logger.info("Connections: {requests:,} requests over {connections:,} connections"
+                " ({reused:,} reused, {retries:,} retries)".format(**api.transport.stats()))
+    if recorder is not None:
+        recorder.close()
+        logger.info(f"Recorded {recorder.calls:,} calls to {options.record}")
     if chain.stop:
         api.command("stop")
     return 0
@@ -0,0 +1,49 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Add many external addresses with permissions to a chain",
+                            parents=[chain.options_parser()])
+    parser.add_argument("-n", "--count", type=int, metavar="N", default=1000,
+                        help="number of addresses (default: %(default)s)")
+    parser.add_argument("--permissions", metavar="LIST", default="send,receive",
+                        help="comma separated permissions to grant (default: %(default)s)")
+    parser.add_argument("--keystore", metavar="FILE",
+                        help="keypairs to reuse and extend (default: DATADIR/CHAIN-keystore.json)")
+    parser.add_argument("--batch-size", type=int, metavar="N", default=RpcApi.DEFAULT_ADDRESS_BATCH_SIZE,
+                        help="addresses per createkeypairs, importaddress and grant call (default: %(default)s)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    options.keystore = Path(options.keystore) if options.keystore else chain.datadir / f"{chain.name}-keystore.json"
+    option_display.append(("Addresses", options.count))
+    option_display.append(("Permissions", options.permissions))
+    option_display.append(("Keystore", options.keystore))
+    option_display.append(("Batch size", options.batch_size))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, datadir=chain.datadir, notifier=chain.notifier)
+    api.provision_addresses(options.count, options.permissions, options.keystore, options.batch_size)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
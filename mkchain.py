@@ -15,9 +15,8 @@ address1 = None
 def create_cache(api: RpcApi, data: bytes) -> str:
     logger.debug(f"create_cache()")
 
-    cache_ident = api.command("createbinarycache")
+    cache_ident = api.upload_binary_cache(data)
     logger.debug(f"create_cache(chain_name={api.chain.name!r}, data={data!r}) -> cache_ident={cache_ident!r}")
-    api.command("appendbinarycache", cache_ident, data.hex())
     return cache_ident
 
 
@@ -25,17 +24,17 @@ def create_stream(api: RpcApi, stream_name: str, cache_ident: str):
     logger.debug(f"create_stream(stream_name={stream_name!r}, cache_ident={cache_ident!r})")
 
     restrict_stream_name = stream_name + "_restrict"
-    api.api.print_tx("create", "stream", restrict_stream_name, {"restrict": "offchain,write"})
+    api.print_tx("create", "stream", restrict_stream_name, {"restrict": "offchain,write"})
 
     api.command("create", "stream", stream_name, True)
     api.command("publish", stream_name, "key1", os.urandom(100).hex())
     api.command("publish", stream_name, "key2",
                 {"text": "Hello there! I am a pretty long string, so it should be truncated on display"})
     api.command("publish", stream_name, "key3", {"cache": cache_ident})
-    api.api.print_tx("publish", stream_name, "key4", {"text": "hello"}, "offchain")
+    api.print_tx("publish", stream_name, "key4", {"text": "hello"}, "offchain")
     api.command("publish", stream_name, [f"key{i}" for i in range(10, 20)],
                 {"json": {"First": 1, "second": ["one", "two", "three", "four", "five"]}})
-    api.print_command("liststreamitems", stream_name, is_log=False)
+    api.print_stream_items(stream_name)
 
 
 def create_asset(api: RpcApi, asset_name: str):
@@ -115,17 +114,21 @@ def main():
     chain = Chain(logger)
     options = get_options(chain)
 
-    chain.create()
-    api = RpcApi(logger, chain.name, options.verbose)
-    api.adjust_config()
-    cache_ident = create_cache(options.chain, "This is a pretty long ASCII chunk in the binary cache".encode())
-    if options.stream:
-        create_stream(options.chain, options.stream, cache_ident)
-    if options.asset:
-        create_asset(options.chain, options.asset)
-    create_upgrade(options.chain)
+    def populate():
+        api = RpcApi(logger, chain.name, options.verbose, notifier=chain.notifier)
+        api.adjust_config()
+        cache_ident = create_cache(api, "This is a pretty long ASCII chunk in the binary cache".encode())
+        if options.stream:
+            create_stream(api, options.stream, cache_ident)
+        if options.asset:
+            create_asset(api, options.asset)
+        create_upgrade(api)
+        if chain.template:
+            api.wait_for_mining()
+
+    chain.create_from_template(populate)
     if options.pause:
-        create_paused_transaction(options.chain, options.stream)
+        create_paused_transaction(RpcApi(logger, chain.name, options.verbose, notifier=chain.notifier), options.stream)
     return 0
 
 
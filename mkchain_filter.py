@@ -16,8 +16,8 @@ def create_stream(api: RpcApi, stream_name: str) -> str:
 
     api.command("create", "stream", stream_name, True)
     tx_id = api.print_tx("publish", stream_name, "key1", os.urandom(500).hex())
-    api.print_command("liststreamitems", stream_name)
-    return api.command("getrawtransaction", tx_id)
+    api.print_stream_items(stream_name)
+    return api.get_raw_transaction(tx_id)
 
 
 def get_options(chain: Chain):
@@ -37,7 +37,7 @@ def get_options(chain: Chain):
 
 def main():
     logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
-    logging.getLogger("Savoir").setLevel(logging.WARNING)
+    logging.getLogger("creator.transport").setLevel(logging.WARNING)
     chain = Chain(logger)
     options = get_options(chain)
 
@@ -65,10 +65,10 @@ function filtertransaction()
     _proc = None
     if options.init:
         _proc = chain.create()
-        api = RpcApi(logger, chain.name, options.verbose)
+        api = RpcApi(logger, chain.name, options.verbose, notifier=chain.notifier)
         api.adjust_config()
     else:
-        api = RpcApi(logger, chain.name, options.verbose)
+        api = RpcApi(logger, chain.name, options.verbose, notifier=chain.notifier)
     tx = create_stream(api, options.stream)
     api.print_command("testtxfilter", {"for": options.stream}, good_script, tx)
     api.print_command("testtxfilter", {"for": options.stream}, bad_script, tx)
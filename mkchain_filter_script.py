@@ -6,6 +6,8 @@ from typing import List
 
 import mkchain_utils
 from creator.chain import Chain
+from creator.rpc_api import RpcApi
+from creator.script_runner import ScriptRunner
 from mkchain_utils import dq, gen_commands, j, sq, write_script
 
 module_name = Path(__file__).stem
@@ -14,6 +16,21 @@ logger = logging.getLogger(module_name)
 
 def build_script(chain: Chain, init: bool) -> List[str]:
     logger.debug("build_script()")
+    commands = [mkchain_utils.HEADER1.format(MCFOLDER=Path(chain.bindir).resolve(), NOW=datetime.now())]
+    if init:
+        commands.append(mkchain_utils.HEADER2.format(
+            CHAIN=mkchain_utils.CHAIN_NAME,
+            PROTOCOL=mkchain_utils.PROTOCOL,
+            DEBUG="-debug" if chain.debug else "",
+            MCPARAMS=str(chain.path / "params.dat"),
+            MCCONF=str(chain.path / "multichain.conf")
+        ).strip())
+    return commands + build_commands()
+
+
+def build_commands() -> List[str]:
+    """ Build the commands that exercise filters on a running chain. """
+    logger.debug("build_commands()")
     address_sed = "sed -n -E " + sq(r's/.*"address"\s*:\s*"(\w+)".*/\1/p')
     good_script = """
 var filtertransaction = function () {
@@ -47,15 +64,7 @@ var filtertransaction = function () {
 }
 """
 
-    commands = [mkchain_utils.HEADER1.format(MCFOLDER=Path(chain.bindir).resolve(), NOW=datetime.now())]
-    if init:
-        commands.append(mkchain_utils.HEADER2.format(
-            CHAIN=mkchain_utils.CHAIN_NAME,
-            PROTOCOL=mkchain_utils.PROTOCOL,
-            DEBUG="-debug" if chain.debug else "",
-            MCPARAMS=str(chain.path / "params.dat"),
-            MCCONF=str(chain.path / "multichain.conf")
-        ).strip())
+    commands = []
     commands.extend(gen_commands('listpermissions', 'issue', '|', address_sed, var_name='address1'))
     commands.extend(gen_commands('create', 'stream', 'stream1', 'true'))
     commands.extend(gen_commands('publish', 'stream1', sq('["key1"]'), j({"text": "Hello from Zvi"}),
@@ -97,6 +106,8 @@ def get_options(chain: Chain):
     parser.add_argument("-s", "--script", metavar="FILE", default="make_filter_chain.sh",
                         help="name of the output script")
     parser.add_argument("-i", "--init", action="store_true", help="initialize the chain before populating it")
+    parser.add_argument("--run", action="store_true",
+                        help="run the commands in-process instead of writing the script")
     parser.add_argument("-p", "--protocol", metavar="VER", type=int, default=mkchain_utils.PROTOCOL,
                         help="protocol version (default: %(default)s)")
 
@@ -105,9 +116,9 @@ def get_options(chain: Chain):
     mkchain_utils.CHAIN_NAME = options.chain
     mkchain_utils.PROTOCOL = options.protocol
     option_display = chain.process_options(options)
-    option_display.append(("Script file", options.script))
+    option_display.append(("Script file", None if options.run else options.script))
     option_display.append(("Init chain", options.init))
-    option_display.append(("Protocol", options.Protocol))
+    option_display.append(("Protocol", options.protocol))
     chain.log_options(parser, option_display)
 
     return options
@@ -117,8 +128,16 @@ def main():
     logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
     chain = Chain(logger)
     options = get_options(chain)
-    commands = build_script(chain, options.init)
-    write_script(options.script, commands)
+    if options.run:
+        if options.init:
+            chain.protocol = options.protocol
+            chain.create()
+        api = RpcApi(logger, chain.name, options.verbose, datadir=chain.datadir, notifier=chain.notifier)
+        if options.init:
+            api.adjust_config()
+        ScriptRunner(logger, api).run(build_commands())
+    else:
+        write_script(options.script, build_script(chain, options.init))
     return 0
 
 
@@ -7,6 +7,8 @@ from typing import List
 
 import mkchain_utils
 from creator.chain import Chain
+from creator.rpc_api import RpcApi
+from creator.script_runner import ScriptRunner
 from mkchain_utils import dq, gen_commands, j, json_data, sq, text_data, write_script, HEADER2, PROTOCOL, HEADER1, \
     DATA_MARKER
 
@@ -16,10 +18,6 @@ logger = logging.getLogger(module_name)
 
 def build_script(chain: Chain) -> List[str]:
     logger.debug("build_script()")
-    key_names = [f"key{i}" for i in range(10, 20)]
-    address_sed = "sed -n -E " + sq(r's/.*"address"\s*:\s*"(\w+)".*/\1/p')
-    multi_items = [{"for": "stream1", "keys": [f"key{i}"], "data": text_data()} for i in (3, 4, 5)]
-
     commands = [HEADER1.format(MCFOLDER=Path(chain.bindir).resolve(), NOW=datetime.now()),
                 HEADER2.format(
                     CHAIN=chain.name,
@@ -27,6 +25,17 @@ def build_script(chain: Chain) -> List[str]:
                     DEBUG="-debug" if chain.debug else "",
                     MCPARAMS=str(chain.path / "params.dat"),
                     MCCONF=str(chain.path / "multichain.conf")).strip()]
+    return commands + build_commands()
+
+
+def build_commands() -> List[str]:
+    """ Build the commands that populate a running chain. """
+    logger.debug("build_commands()")
+    key_names = [f"key{i}" for i in range(10, 20)]
+    address_sed = "sed -n -E " + sq(r's/.*"address"\s*:\s*"(\w+)".*/\1/p')
+    multi_items = [{"for": "stream1", "keys": [f"key{i}"], "data": text_data()} for i in (3, 4, 5)]
+
+    commands = []
     commands.extend(gen_commands('listpermissions', 'issue', '|', address_sed, var_name='address1'))
     commands.extend(gen_commands('createkeypairs', '|', address_sed, var_name='address2'))
     commands.extend(gen_commands('importaddress', '$address2', 'external'))
@@ -75,6 +84,8 @@ def get_options(chain: Chain):
     parser = argparse.ArgumentParser(description="Build a script that builds a new chain",
                                      parents=[chain.options_parser()])
     parser.add_argument("-s", "--script", metavar="FILE", default="make_chain.sh", help="name of the output script")
+    parser.add_argument("--run", action="store_true",
+                        help="create the chain and run the commands in-process instead of writing the script")
     parser.add_argument("-p", "--protocol", metavar="VER", type=int, default=PROTOCOL,
                         help="protocol version (default: %(default)s)")
 
@@ -84,7 +95,7 @@ def get_options(chain: Chain):
     mkchain_utils.PROTOCOL = options.protocol
 
     option_display = chain.process_options(options)
-    option_display.append(("Script file", options.script))
+    option_display.append(("Script file", None if options.run else options.script))
     option_display.append(("Protocol", options.protocol))
     chain.log_options(parser, option_display)
 
@@ -95,8 +106,14 @@ def main():
     logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
     chain = Chain(logger)
     options = get_options(chain)
-    commands = build_script(chain)
-    write_script(options.script, commands)
+    if options.run:
+        chain.protocol = options.protocol
+        chain.create()
+        api = RpcApi(logger, chain.name, options.verbose, datadir=chain.datadir, notifier=chain.notifier)
+        api.adjust_config()
+        ScriptRunner(logger, api).run(build_commands())
+    else:
+        write_script(options.script, build_script(chain))
     return 0
 
 
@@ -1,14 +1,14 @@
 import json
 import logging
 import os
-import random
 import stat
-import string
 import sys
 from argparse import ArgumentParser
 from pathlib import Path
 from typing import List, Tuple, Any
 
+from creator.utils import payloads
+
 module_name = Path(__file__).stem
 logger = logging.getLogger(module_name)
 
@@ -28,12 +28,13 @@ export PATH={MCFOLDER}:$PATH
 """
 HEADER2 = r"""
 multichain-cli {CHAIN} stop
-sleep 1
+for i in $(seq 100); do pgrep -f "multichaind {CHAIN} " > /dev/null || break; sleep 0.1; done
 rm -rf ~/.multichain/{CHAIN}
 multichain-util create {CHAIN} {PROTOCOL}
-sleep 1
+test -f {MCPARAMS} || exit 1
 multichaind {CHAIN} -daemon -autosubscribe=assets,streams {DEBUG}
-sleep 1
+for i in $(seq 600); do multichain-cli {CHAIN} getinfo > /dev/null 2>&1 && break; sleep 0.1; done
+multichain-cli {CHAIN} getinfo > /dev/null || exit 1
 rpc_port=`sed -n -E 's/.*default-rpc-port\s*=\s*(\w+)\s*.*/\1/p' {MCPARAMS}`
 echo "rpcport=$rpc_port"
 echo "rpcport=$rpc_port" >> {MCCONF}
@@ -67,19 +68,17 @@ def j(o: object) -> str:
 
 def hex_data(length: int = 50) -> str:
     """ Generate a random string with `length` hexadecimal characters. """
-    return ''.join(random.choices(string.hexdigits, k=length)).lower()
+    return payloads.hex_data(length)
 
 
 def text_data(length: int = 50) -> object:
     """ Generate a random multichain text data string with `length` characters. """
-    message = ''.join(random.choices(string.ascii_letters, k=length))
-    return {"text": message}
+    return payloads.text_data(length)
 
 
 def json_data(length: int = 50) -> object:
     """ Generate a random multichain JSON data string with a message of `length` characters. """
-    message = ''.join(random.choices(string.ascii_letters, k=length))
-    return {"json": {"list": [1, 2, 3], "message": message}}
+    return payloads.json_data(length)
 
 
 def raw_command(*cmd) -> str:
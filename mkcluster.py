@@ -0,0 +1,48 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.cluster import Cluster
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Build a chain with several nodes on this host",
+                            parents=[chain.options_parser()])
+    parser.add_argument("-n", "--nodes", type=int, metavar="N", default=2,
+                        help="number of nodes besides the seed node (default: %(default)s)")
+    parser.add_argument("--base-port", type=int, metavar="PORT",
+                        help="first network port for the extra nodes; each node uses two ports"
+                             " (default: 10 above the seed network port)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Nodes", options.nodes))
+    option_display.append(("Base port", options.base_port))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    cluster = Cluster(logger, chain, options.nodes, base_port=options.base_port)
+    apis = cluster.create()
+    for api in apis:
+        info = api.command("getinfo")
+        logger.info(f"  {api.chain.datadir}: rpc port {api.rpc_port}, {info['connections']} connections")
+    if chain.stop:
+        cluster.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
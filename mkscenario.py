@@ -0,0 +1,56 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.rpc_api import RpcApi
+from creator.scenario import Scenario, ScenarioExecutor, load_scenario
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Build a chain from a scenario file", parents=[chain.options_parser()])
+    parser.add_argument("scenario", metavar="FILE", help="JSON or YAML scenario")
+    parser.add_argument("-i", "--init", action="store_true", help="(re)create the chain first")
+    parser.add_argument("--workers", type=int, metavar="N", default=8,
+                        help="steps run in parallel (default: %(default)s)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Scenario", options.scenario))
+    option_display.append(("Create", options.init))
+    option_display.append(("Workers", options.workers))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+    path = Path(options.scenario)
+    spec = load_scenario(path)
+
+    def populate():
+        api = RpcApi(logger, chain.name, options.verbose, pool_size=options.workers,
+                     datadir=chain.datadir, notifier=chain.notifier)
+        if options.init:
+            api.adjust_config()
+        ScenarioExecutor(logger, options.workers).run(Scenario(api, spec, path.parent).steps)
+        if chain.template:
+            api.wait_for_mining()
+
+    if options.init:
+        chain.create_from_template(populate)
+    else:
+        populate()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.metrics import CallMetrics
+from creator.rpc_api import RpcApi
+from creator.trace import TraceReplayer, read_trace, summarize
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Replay a recorded JSON-API trace against a chain",
+                            parents=[chain.options_parser()])
+    parser.add_argument("trace", metavar="FILE", help="JSONL trace recorded with --record")
+    speed_group = parser.add_mutually_exclusive_group()
+    speed_group.add_argument("--speed", type=float, metavar="N", default=1.0,
+                             help="replay N times faster than recorded (default: %(default)s)")
+    speed_group.add_argument("--fast", action="store_true", help="replay as fast as possible")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=8,
+                        help="calls in flight at most (default: %(default)s)")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Trace", options.trace))
+    option_display.append(("Speed", "fast" if options.fast else f"{options.speed}x"))
+    option_display.append(("Concurrency", options.concurrency))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency, metrics=CallMetrics(),
+                 datadir=chain.datadir, notifier=chain.notifier)
+    replayer = TraceReplayer(logger, api, None if options.fast else options.speed, options.concurrency)
+    elapsed = replayer.replay(read_trace(options.trace))
+    recorded, duration = summarize(options.trace)
+    logger.info(f"Recorded over {duration:.2f} sec:")
+    recorded.report(logger, duration)
+    logger.info(f"Replayed in {elapsed:.2f} sec, {replayer.late:,} calls sent late,"
+                f" {len(replayer.substitutes):,} ids substituted:")
+    api.metrics.report(logger, elapsed)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
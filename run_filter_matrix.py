@@ -0,0 +1,65 @@
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from creator.chain import Chain
+from creator.filter_matrix import FilterMatrix
+from creator.rpc_api import RpcApi
+
+module_name = Path(__file__).stem
+logger = logging.getLogger(module_name)
+
+
+def get_options(chain: Chain):
+    parser = ArgumentParser(description="Run a suite of filter scripts against fixture transactions",
+                            parents=[chain.options_parser()])
+    parser.add_argument("suite", metavar="DIR", help="folder with the *.js filter scripts and suite.json")
+    parser.add_argument("-i", "--init", action="store_true", help="(re)create a chain")
+    parser.add_argument("--cache", metavar="DIR", help="fixture hex cache (default: DIR/.fixtures)")
+    parser.add_argument("--concurrency", type=int, metavar="N", default=8,
+                        help="filter calls in parallel (default: %(default)s)")
+    parser.add_argument("-o", "--output", metavar="FILE", help="write the results as JSON")
+
+    options = parser.parse_args()
+
+    option_display = chain.process_options(options)
+    option_display.append(("Create", options.init))
+    option_display.append(("Suite", options.suite))
+    option_display.append(("Cache", options.cache))
+    option_display.append(("Concurrency", options.concurrency))
+    chain.log_options(parser, option_display)
+
+    return options
+
+
+def main():
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format="%(asctime)s %(levelname)-7s %(message)s")
+    chain = Chain(logger)
+    options = get_options(chain)
+
+    if options.init:
+        chain.create()
+        api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency,
+                     datadir=chain.datadir, notifier=chain.notifier)
+        api.adjust_config()
+    else:
+        api = RpcApi(logger, chain.name, options.verbose, pool_size=options.concurrency,
+                     datadir=chain.datadir, notifier=chain.notifier)
+    matrix = FilterMatrix(logger, api, Path(options.suite), Path(options.cache) if options.cache else None,
+                          options.concurrency)
+    cells = matrix.run()
+    matrix.log_table(cells)
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump([dict(cell._asdict(), ok=cell.ok) for cell in cells], f, indent=2)
+        logger.info(f"Results written to {options.output}")
+    failures = sum(not cell.ok for cell in cells)
+    logger.info(f"{len(cells) - failures} of {len(cells)} passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
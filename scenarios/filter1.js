@@ -0,0 +1,7 @@
+var filtertransaction = function () {
+    var tx = getfiltertransaction();
+    if (tx.vout.length < 2)
+    {
+        return 'Two transaction outputs required';
+    }
+};